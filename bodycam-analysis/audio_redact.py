@@ -0,0 +1,240 @@
+"""
+Audio PII redaction driven by Whisper word timestamps.
+
+PIIMatcher runs regexes (phone numbers, addresses, names, ...) over the joined
+word-level transcript and maps every match back to a [start, end] time span.
+redact_wav then mutes or bleeps those spans in a single streaming pass over the
+PCM, and mux_audio puts the result back into the MP4 without re-encoding video.
+
+Timestamps come from the 16 kHz mono WAV made for Whisper, but the audio that
+is redacted and muxed is the source track at its native rate and channel
+count (extract_audio), so only the PII spans change.
+"""
+
+import json
+import logging
+import re
+import subprocess
+import wave
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+_STREET = (
+    r"(?:street|st|avenue|ave|road|rd|boulevard|blvd|drive|dr|lane|ln|court|ct|"
+    r"way|place|pl|circle|cir|highway|hwy|parkway|pkwy|terrace|ter)"
+)
+
+# Patterns are case-sensitive unless they opt in with (?i). A named group
+# `pii` limits redaction to that part of the match.
+DEFAULT_PATTERNS = {
+    "phone": r"(?:\+?1[\s.-]?)?\(?\b\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}\b",
+    "ssn": r"\b\d{3}[\s-]\d{2}[\s-]\d{4}\b",
+    "email": r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b",
+    "address": rf"(?i)\b\d{{1,6}}\s+(?:[\w'-]+\s+){{1,3}}{_STREET}\b\.?",
+    "date": r"\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b",
+    "name": r"\b(?i:my name is|my name's|name is|last name|first name)[\s,]+(?P<pii>[A-Z][\w'-]+(?:\s+[A-Z][\w'-]+)?)",
+}
+
+# Spans closer than this are merged; every span is widened by PADDING_S.
+PADDING_S = 0.1
+
+
+class PIISpan(NamedTuple):
+    start: float
+    end: float
+    kind: str
+    text: str
+
+
+class PIIMatcher:
+
+    def __init__(
+        self,
+        patterns: Optional[Dict[str, str]] = None,
+        names: Optional[List[str]] = None,
+        padding_s: float = PADDING_S
+    ):
+        patterns = dict(DEFAULT_PATTERNS if patterns is None else patterns)
+        if names:
+            alternatives = "|".join(re.escape(n) for n in sorted(names, key=len, reverse=True))
+            patterns["known_name"] = rf"(?i)\b(?:{alternatives})\b"
+        self.patterns = {kind: re.compile(rx) for kind, rx in patterns.items()}
+        self.padding_s = padding_s
+
+    @classmethod
+    def from_config(cls, path: Optional[str] = None) -> "PIIMatcher":
+        """
+        Build from a JSON file of the form
+        {"patterns": {kind: regex}, "disable": [kind], "names": [...], "padding_s": 0.1}.
+        Patterns are added to (or override) the defaults.
+        """
+        if path is None:
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        patterns = dict(DEFAULT_PATTERNS)
+        patterns.update(config.get("patterns", {}))
+        for kind in config.get("disable", []):
+            patterns.pop(kind, None)
+        return cls(patterns, config.get("names"), config.get("padding_s", PADDING_S))
+
+    def find_spans(self, words: List[Dict]) -> List[PIISpan]:
+        """Match over the joined transcript and return merged, padded time spans."""
+        if not words:
+            return []
+
+        tokens = [w["text"].strip() for w in words]
+        text = " ".join(tokens)
+        # char offset at which each word begins in `text`
+        lengths = np.fromiter((len(t) + 1 for t in tokens), dtype=np.int64, count=len(tokens))
+        word_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+        hits = []
+        for kind, rx in self.patterns.items():
+            for m in rx.finditer(text):
+                a, b = m.span("pii") if "pii" in rx.groupindex else m.span()
+                if b <= a:
+                    continue
+                first = int(np.searchsorted(word_starts, a, side="right")) - 1
+                last = int(np.searchsorted(word_starts, b - 1, side="right")) - 1
+                hits.append(PIISpan(
+                    max(0.0, words[first]["start"] - self.padding_s),
+                    words[last]["end"] + self.padding_s,
+                    kind,
+                    text[a:b]
+                ))
+
+        return merge_spans(hits)
+
+
+def merge_spans(spans: List[PIISpan]) -> List[PIISpan]:
+    merged: List[PIISpan] = []
+    for span in sorted(spans):
+        if merged and span.start <= merged[-1].end:
+            prev = merged[-1]
+            kinds = prev.kind if span.kind in prev.kind.split("+") else f"{prev.kind}+{span.kind}"
+            merged[-1] = PIISpan(prev.start, max(prev.end, span.end), kinds, f"{prev.text} | {span.text}")
+        else:
+            merged.append(span)
+    return merged
+
+
+def redact_wav(
+    in_path: str,
+    out_path: str,
+    spans: List[PIISpan],
+    mode: str = "bleep",
+    block_frames: int = 1 << 16,
+    bleep_hz: float = 1000.0,
+    bleep_level: float = 0.2
+):
+    """
+    Stream `in_path` to `out_path` block by block, overwriting every span with
+    silence ("mute") or a sine tone ("bleep"). Span edges are rounded to the
+    nearest sample; memory use is bounded by `block_frames`.
+    """
+    if mode not in ("mute", "bleep"):
+        raise ValueError(f"Unknown redaction mode '{mode}' (expected 'mute' or 'bleep')")
+
+    with wave.open(in_path, "rb") as src:
+        params = src.getparams()
+        if params.sampwidth != 2:
+            raise ValueError(f"Only 16-bit PCM WAV is supported, got {8 * params.sampwidth}-bit")
+        rate, channels = params.framerate, params.nchannels
+
+        # merged in sample space: the block loop needs sorted, disjoint ranges
+        bounds = []
+        for start, end in sorted((round(s.start * rate), round(s.end * rate)) for s in spans):
+            if end <= start:
+                continue
+            if bounds and start <= bounds[-1][1]:
+                bounds[-1][1] = max(bounds[-1][1], end)
+            else:
+                bounds.append([start, end])
+        bounds = np.array(bounds, dtype=np.int64).reshape(-1, 2)
+        omega = 2 * np.pi * bleep_hz / rate
+        amplitude = bleep_level * np.iinfo(np.int16).max
+
+        with wave.open(out_path, "wb") as dst:
+            dst.setparams(params)
+            pos, k = 0, 0
+            while True:
+                raw = src.readframes(block_frames)
+                if not raw:
+                    break
+                block = np.frombuffer(raw, dtype="<i2").reshape(-1, channels)
+                end = pos + len(block)
+
+                while k < len(bounds) and bounds[k, 1] <= pos:
+                    k += 1
+                j = k
+                if j < len(bounds) and bounds[j, 0] < end:
+                    block = block.copy()
+                    while j < len(bounds) and bounds[j, 0] < end:
+                        a = max(bounds[j, 0], pos) - pos
+                        b = min(bounds[j, 1], end) - pos
+                        if mode == "mute":
+                            block[a:b] = 0
+                        else:
+                            # phase from the absolute sample index so the tone is
+                            # continuous across block boundaries
+                            t = np.arange(pos + a, pos + b, dtype=np.float64)
+                            block[a:b] = (amplitude * np.sin(omega * t)).astype(np.int16)[:, None]
+                        j += 1
+
+                dst.writeframes(block.tobytes())
+                pos = end
+
+
+def extract_audio(video_path: str, wav_path: str):
+    """Decode the first audio track to 16-bit PCM at its native rate and channels."""
+    cmd = [
+        'ffmpeg', '-v', 'error',
+        '-i', video_path,
+        '-map', '0:a:0',
+        '-c:a', 'pcm_s16le',
+        '-y', wav_path
+    ]
+    subprocess.run(cmd, check=True)
+
+
+def mux_audio(video_path: str, audio_path: str, output_path: str):
+    """Replace the audio track of `video_path`; the video stream is copied as-is."""
+    cmd = [
+        'ffmpeg', '-v', 'error',
+        '-i', video_path,
+        '-i', audio_path,
+        '-map', '0:v:0',
+        '-map', '1:a:0',
+        '-c:v', 'copy',
+        '-c:a', 'aac',
+        '-shortest',
+        '-y', output_path
+    ]
+    subprocess.run(cmd, check=True)
+
+
+def main():
+
+    MP4_FILE = "body_worn_camera_example_footage.mp4"
+    WAV_FILE = "body_worn_camera_example_footage_native.wav"
+    WORDS_FILE = "session_words.json"
+    PII_CONFIG = None
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    with open(WORDS_FILE, "r", encoding="utf-8") as f:
+        words = json.load(f)
+
+    spans = PIIMatcher.from_config(PII_CONFIG).find_spans(words)
+    for span in spans:
+        print(f"[{span.start:.2f}-{span.end:.2f}] {span.kind}: {span.text}")
+
+    extract_audio(MP4_FILE, WAV_FILE)
+    redact_wav(WAV_FILE, "body_worn_camera_example_footage_redacted.wav", spans)
+    mux_audio(MP4_FILE, "body_worn_camera_example_footage_redacted.wav", "body_worn_camera_example_footage_audio_redacted.mp4")
+
+
+if __name__ == "__main__":
+    main()
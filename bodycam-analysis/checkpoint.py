@@ -0,0 +1,62 @@
+"""
+Durable progress checkpoints for long-running transcription and render jobs.
+
+A checkpoint is a small JSON file written atomically (temp file + fsync +
+rename) next to the job's output. It stores a fingerprint of the input and the
+job parameters; if either changes, the stale checkpoint is ignored and the job
+starts over.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(input_path: str, **params) -> Dict:
+    stat = os.stat(input_path)
+    return {
+        "input": os.path.abspath(input_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "params": params,
+    }
+
+
+class JobCheckpoint:
+
+    def __init__(self, path: str, key: Dict):
+        self.path = Path(path)
+        # round-trip so tuples etc. compare equal to what we read back
+        self.key = json.loads(json.dumps(key))
+
+    def load(self) -> Optional[Dict]:
+        if not self.path.exists():
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint {self.path}: {e}")
+            return None
+        if data.get("key") != self.key:
+            logger.info(f"Checkpoint {self.path} is for a different input/params, starting fresh")
+            return None
+        return data.get("state")
+
+    def save(self, state: Dict):
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"key": self.key, "state": state}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
@@ -1,22 +1,32 @@
 from typing import Optional
-from tavily import TavilyClient
-import json
+import threading
 import dotenv
 import os
 
-# Load .env.local from frontend directory or parent directories
-dotenv.load_dotenv(dotenv_path=".env.local")
-if not os.getenv("TAVILY"):
-    dotenv.load_dotenv(dotenv_path="../../.env.local")
+_client = None
+_client_lock = threading.Lock()
 
-api_key = os.getenv("TAVILY")
-if not api_key:
-    raise ValueError("TAVILY API key not found. Please set TAVILY environment variable or create .env.local file.")
+def load_env():
+    # Load .env.local from frontend directory or parent directories
+    dotenv.load_dotenv(dotenv_path=".env.local")
+    if not os.getenv("TAVILY"):
+        dotenv.load_dotenv(dotenv_path="../../.env.local")
+    return os.getenv("TAVILY")
 
-client = TavilyClient(api_key)
+def get_client():
+    """Build the Tavily client on first use (reads .env.local, no network call)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            api_key = load_env()
+            if not api_key:
+                raise ValueError("TAVILY API key not found. Please set TAVILY environment variable or create .env.local file.")
+            from tavily import TavilyClient
+            _client = TavilyClient(api_key)
+        return _client
 
 def response(query: str) -> object:
-    response = client.search(
+    response = get_client().search(
         query=query,
         include_answer="advanced",
         search_depth="basic"
@@ -24,4 +34,5 @@ def response(query: str) -> object:
 
     return response
 
-print(response("You are a master police chief seargant that is looking at information from bodycam footage. Answer the questions in this manner, with high insight and intelligence"))
\ No newline at end of file
+if __name__ == "__main__":
+    print(response("You are a master police chief seargant that is looking at information from bodycam footage. Answer the questions in this manner, with high insight and intelligence"))
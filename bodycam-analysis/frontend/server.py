@@ -1,44 +1,270 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 import sys
 import os
+import gzip
+import json
+import time
 import logging
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
-# Setup logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Check for environment variables
-env_path = "../../.env.local"
-if not os.path.exists(env_path):
-    logger.warning(f"Environment file not found at {env_path}")
-    # Try other common locations
-    if os.path.exists(".env.local"):
-        env_path = ".env.local"
-    elif os.path.exists("../.env.local"):
-        env_path = "../.env.local"
-    else:
-        logger.warning("No .env.local file found. Please ensure TAVILY API key is set.")
+import metrics
+from transcript_store import convert_json, open_store, wait_for_swap
 
-try:
-    from agent import response as get_agent_response
-except ImportError as e:
-    logger.error(f"Failed to import agent: {e}")
-    get_agent_response = None
+get_agent_response = None
+started_at = time.perf_counter()
+# component -> {'ready': bool, 'error': str|None}; filled in by init()
+readiness = {}
+# components the server cannot do its job without; the rest are reported only
+REQUIRED_COMPONENTS = ('agent',)
+init_done = threading.Event()
+init_started = False
+init_start_lock = threading.Lock()
+init_lock = threading.Lock()
+
+def check_env():
+    # Check for environment variables
+    env_path = "../../.env.local"
+    if not os.path.exists(env_path):
+        logger.warning(f"Environment file not found at {env_path}")
+        # Try other common locations
+        if os.path.exists(".env.local"):
+            env_path = ".env.local"
+        elif os.path.exists("../.env.local"):
+            env_path = "../.env.local"
+        else:
+            logger.warning("No .env.local file found. Please ensure TAVILY API key is set.")
+
+def init_agent():
+    global get_agent_response
+    with init_lock:
+        if get_agent_response is not None:
+            return get_agent_response
+        try:
+            import agent
+            agent.get_client()
+        except (ImportError, ValueError) as e:
+            logger.error(f"Failed to load agent: {e}")
+            readiness['agent'] = {'ready': False, 'error': str(e)}
+            return None
+        get_agent_response = agent.response
+        readiness['agent'] = {'ready': True, 'error': None}
+        return get_agent_response
+
+def init_transcript():
+    try:
+        get_transcript_store()
+        readiness['transcript'] = {'ready': True, 'error': None}
+    except (FileNotFoundError, ValueError) as e:
+        readiness['transcript'] = {'ready': False, 'error': str(e)}
+
+def init(background=True):
+    """
+    Load the agent and transcript store. Import does none of this, so the
+    server answers /health immediately and reports readiness once done.
+    Runs once; later calls return straight away.
+    """
+    global init_started
+    with init_start_lock:
+        if init_started:
+            return
+        init_started = True
+
+    def run():
+        start = time.perf_counter()
+        check_env()
+        init_agent()
+        init_transcript()
+        init_done.set()
+        metrics_view.record('gauge', 'server_init_seconds', time.perf_counter() - start)
+        logger.info(f"Initialized in {time.perf_counter() - start:.2f}s")
+
+    if background:
+        threading.Thread(target=run, name="server-init", daemon=True).start()
+    else:
+        run()
 
 app = Flask(__name__)
 CORS(app)
 
+# Aggregates the pipeline's JSON-lines metrics plus this server's own counters
+metrics_view = metrics.MetricsRegistry(enabled=True)
+metrics_offset = 0
+# replay + offset update must be atomic, or concurrent scrapes double-count
+metrics_lock = threading.Lock()
+
+@app.before_request
+def start_timer():
+    request.start_time = time.perf_counter()
+
+@app.before_request
+def ensure_init():
+    # WSGI hosts (gunicorn, `flask run`) import `app` and never run __main__,
+    # so the first request starts init; /health still answers while it runs
+    init()
+
+@app.after_request
+def record_request(response):
+    if request.endpoint != 'metrics_endpoint':
+        elapsed = time.perf_counter() - getattr(request, 'start_time', time.perf_counter())
+        endpoint = request.endpoint or 'unknown'
+        metrics_view.record('counter', 'http_requests', 1, endpoint=endpoint, status=response.status_code)
+        metrics_view.record('summary', 'http_request_seconds', elapsed, endpoint=endpoint)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    global metrics_offset
+    with metrics_lock:
+        metrics_offset = metrics_view.replay_jsonl(metrics.registry.path, metrics_offset)
+    return Response(metrics_view.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+PUBLIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'public')
+TRANSCRIPT_STORE = os.getenv('TRANSCRIPT_STORE', os.path.join(PUBLIC_DIR, 'labeled_transcript.store'))
+REASONING_PATH = os.getenv('REASONING_PATH', os.path.join(PUBLIC_DIR, 'ai_reasoning.json'))
+# responses smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 512
+
+transcript_store = None
+transcript_lock = threading.Lock()
+
+def store_needs_rebuild(json_path):
+    """True if the store is missing or older than the pipeline's JSON output."""
+    # missing mid-swap means a writer is publishing right now: wait, don't rebuild
+    if not wait_for_swap(TRANSCRIPT_STORE):
+        return True
+    try:
+        store_mtime = os.stat(os.path.join(TRANSCRIPT_STORE, 'meta.json')).st_mtime_ns
+    except FileNotFoundError:
+        return True
+    try:
+        return os.stat(json_path).st_mtime_ns > store_mtime
+    except FileNotFoundError:
+        return False
+
+def get_transcript_store():
+    global transcript_store
+    with transcript_lock:
+        json_path = os.path.splitext(TRANSCRIPT_STORE)[0] + '.json'
+        if store_needs_rebuild(json_path):
+            # conversion from the pipeline's JSON output, e.g. a newer file
+            # copied into public/; the open store then sees itself as stale
+            convert_json(json_path, TRANSCRIPT_STORE)
+        if transcript_store is not None and transcript_store.is_stale():
+            transcript_store.close()
+            transcript_store = None
+        if transcript_store is None:
+            transcript_store = open_store(TRANSCRIPT_STORE)
+        return transcript_store
+
+def accepted_encodings():
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        name, *params = part.strip().split(';')
+        q = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name and q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+def compressed_json(payload, status=200):
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    encoding = None
+    if len(body) >= MIN_COMPRESS_BYTES:
+        accepted = accepted_encodings()
+        if brotli is not None and 'br' in accepted:
+            body, encoding = brotli.compress(body, quality=5), 'br'
+        elif 'gzip' in accepted:
+            body, encoding = gzip.compress(body, compresslevel=6), 'gzip'
+    response = Response(body, status=status, mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+def float_arg(name):
+    value = request.args.get(name)
+    return float(value) if value not in (None, '') else None
+
+@app.route('/api/transcript', methods=['GET'])
+def transcript():
+    """
+    Segments overlapping ?start=&end= (seconds), or a page via ?offset=&limit=.
+    Columnar: start/end/speaker/text arrays, speaker indexes into `speakers`.
+    """
+    try:
+        start, end = float_arg('start'), float_arg('end')
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', 200))
+    except ValueError:
+        return jsonify({'error': 'start/end must be numbers, offset/limit integers', 'success': False}), 400
+    try:
+        store = get_transcript_store()
+    except FileNotFoundError:
+        return jsonify({'error': 'Transcript not found', 'success': False}), 404
+    return compressed_json(store.query(start, end, offset, limit))
+
+@app.route('/api/reasoning', methods=['GET'])
+def reasoning():
+    """AI reasoning output; key phrases are limited to ?start=&end= when given."""
+    try:
+        start, end = float_arg('start'), float_arg('end')
+    except ValueError:
+        return jsonify({'error': 'start/end must be numbers', 'success': False}), 400
+    try:
+        with open(REASONING_PATH, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return jsonify({'error': 'Reasoning not found', 'success': False}), 404
+    summary = data.get('transcriptSummary')
+    if summary and (start is not None or end is not None):
+        lo = start if start is not None else float('-inf')
+        hi = end if end is not None else float('inf')
+        summary['keyPhrases'] = [p for p in summary.get('keyPhrases', []) if lo <= p['time'] < hi]
+    return compressed_json(data)
+
+def is_ready():
+    return init_done.is_set() and all(readiness.get(name, {}).get('ready') for name in REQUIRED_COMPONENTS)
+
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({'status': 'ok', 'message': 'Server is running'}), 200
+    """Liveness: always 200 while the process serves requests. Readiness is reported alongside."""
+    return jsonify({
+        'status': 'ok',
+        'message': 'Server is running',
+        'live': True,
+        'ready': is_ready(),
+        'components': readiness,
+        'uptime': time.perf_counter() - started_at
+    }), 200
+
+@app.route('/health/ready', methods=['GET'])
+def readiness_probe():
+    """Readiness: 503 until init() has finished and the required components loaded."""
+    ready = is_ready()
+    return jsonify({'ready': ready, 'components': readiness}), 200 if ready else 503
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
     try:
-        if get_agent_response is None:
+        # first chat before init() finished (or init() never called) loads it here
+        if (get_agent_response or init_agent()) is None:
             return jsonify({'error': 'Agent module not loaded', 'success': False}), 500
             
         data = request.json
@@ -68,7 +294,14 @@ def chat():
         return jsonify({'error': str(e), 'success': False}), 500
 
 if __name__ == '__main__':
+    # Setup logging
+    logging.basicConfig(level=logging.DEBUG)
+    # start loading before the first request; with debug=True the reloader
+    # parent only watches files, so leave it to the child that serves
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        init()
     print("Starting AI Agent Server...")
-    print("Listening on http://localhost:5000")
+    port = int(os.getenv('PORT', 5000))
+    print(f"Listening on http://localhost:{port}")
     print("API endpoint: /api/chat")
-    app.run(debug=True, port=5000, host='localhost')
+    app.run(debug=True, port=port, host='localhost')
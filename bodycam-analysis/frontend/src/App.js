@@ -3,6 +3,17 @@ import { Play, Pause, Volume2, VolumeX, Maximize, Eye, FileText, Brain, Send, Bo
 import Redact from "./Redact";
 import { BrowserRouter as Router, Routes, Route} from "react-router-dom";
 
+// Seconds of transcript fetched around the playhead; refetched when playback leaves it
+const TRANSCRIPT_WINDOW = 120;
+const TRANSCRIPT_LOOKBEHIND = 30;
+
+const fromColumns = (data) => data.text.map((text, i) => ({
+  start: data.start[i],
+  end: data.end[i],
+  speaker: data.speakers[data.speaker[i]],
+  text
+}));
+
 function Home() {
   const videoRef = useRef(null);
   const chatEndRef = useRef(null);
@@ -15,6 +26,7 @@ function Home() {
   const [blurEnabled, setBlurEnabled] = useState(false);
   const [showTranscript, setShowTranscript] = useState(false);
   const [transcript, setTranscript] = useState([]);
+  const transcriptWindowRef = useRef(null);
   const [aiReasoning, setAiReasoning] = useState(null);
   const [chatMessages, setChatMessages] = useState([
     { role: 'assistant', content: 'Hello! I can help you analyze this bodycam footage. Ask me anything about the video, transcript, or detected objects.' }
@@ -26,12 +38,42 @@ function Home() {
   const [isLoadingNotes, setIsLoadingNotes] = useState(true);
   const [activeTab, setActiveTab] = useState('chat'); // 'chat' or 'reasoning'
 
+  const loadTranscriptWindow = (time) => {
+    const start = Math.max(0, time - TRANSCRIPT_LOOKBEHIND);
+    const end = start + TRANSCRIPT_WINDOW;
+    const requested = { start, end };
+    transcriptWindowRef.current = requested;
+    // a later seek replaces the ref; responses for older windows are dropped
+    const isCurrent = () => transcriptWindowRef.current === requested;
+    fetch(`/api/transcript?start=${start}&end=${end}`)
+      .then(response => {
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        return response.json();
+      })
+      .then(data => {
+        if (isCurrent()) setTranscript(fromColumns(data));
+      })
+      .catch(error => {
+        if (!isCurrent()) return;
+        // API server not running: fall back to the full static transcript
+        console.error('Error loading transcript window, using static file:', error);
+        transcriptWindowRef.current = { start: 0, end: Infinity };
+        fetch('/labeled_transcript.json')
+          .then(response => response.json())
+          .then(data => setTranscript(data))
+          .catch(error => console.error('Error loading transcript:', error));
+      });
+  };
+
   useEffect(() => {
-    fetch('/labeled_transcript.json')
-      .then(response => response.json())
-      .then(data => setTranscript(data))
-      .catch(error => console.error('Error loading transcript:', error));
+    const loaded = transcriptWindowRef.current;
+    if (!loaded || currentTime < loaded.start || currentTime > loaded.end - TRANSCRIPT_LOOKBEHIND) {
+      loadTranscriptWindow(currentTime);
+    }
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [currentTime]);
 
+  useEffect(() => {
     fetch('/ai_reasoning.json')
       .then(response => response.json())
       .then(data => {
@@ -0,0 +1,333 @@
+"""
+Tail-follow ingest for bodycam recordings that are still being written.
+
+ffmpeg reads the growing file with `-follow 1` and streams decoded audio and
+frames over pipes. Audio is transcribed and diarized one window at a time and
+the labeled transcript is republished after every window; frames are redacted
+and appended to the output as fixed-size segments. Both loops stop once the
+file has not grown for `idle_timeout_s`.
+
+Works with fragmented MP4 / MPEG-TS / MKV recordings, i.e. containers that
+are readable before the writer finalizes them.
+"""
+
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+import warnings
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "video"))
+
+import metrics
+from transcribe_and_diarize import BodycamProcessor
+from transcript_store import write_store
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+# cosine similarity above which a window-local speaker is the same person as
+# an already known live speaker
+SPEAKER_MATCH_THRESHOLD = 0.5
+
+
+def write_atomic(path: Path, text: str):
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class SpeakerTracker:
+    """Maps per-window pyannote labels onto stable speaker ids for the session."""
+
+    def __init__(self, threshold: float = SPEAKER_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self.centroids: List[np.ndarray] = []
+        self.weights: List[float] = []
+        self.durations: List[float] = []
+
+    def assign(self, turns, embeddings) -> List[tuple]:
+        local_durations: Dict[str, float] = {}
+        for start, end, label in turns:
+            local_durations[label] = local_durations.get(label, 0.0) + (end - start)
+
+        mapping = {}
+        for label, embedding in embeddings.items():
+            if embedding is None or not np.all(np.isfinite(embedding)):
+                continue
+            embedding = embedding / (np.linalg.norm(embedding) + 1e-9)
+            weight = local_durations.get(label, 0.0)
+            best = None
+            if self.centroids:
+                sims = np.stack(self.centroids) @ embedding
+                best = int(sims.argmax())
+                if sims[best] < self.threshold:
+                    best = None
+            if best is None:
+                self.centroids.append(embedding)
+                self.weights.append(weight)
+                self.durations.append(0.0)
+                best = len(self.centroids) - 1
+            else:
+                total = self.weights[best] + weight
+                if total > 0:
+                    centroid = (self.centroids[best] * self.weights[best] + embedding * weight) / total
+                    self.centroids[best] = centroid / (np.linalg.norm(centroid) + 1e-9)
+                self.weights[best] = total
+            mapping[label] = best
+
+        assigned = []
+        for start, end, label in turns:
+            speaker = mapping.get(label)
+            if speaker is not None:
+                self.durations[speaker] += end - start
+                assigned.append((start, end, speaker))
+        return assigned
+
+    def labels(self) -> Dict[int, str]:
+        # same heuristic as step3: whoever has talked the most is the officer
+        order = np.argsort(self.durations)[::-1]
+        return {
+            int(speaker): "OFFICER" if rank == 0 else f"SUBJECT_{rank}"
+            for rank, speaker in enumerate(order)
+        }
+
+
+class LiveIngest:
+
+    def __init__(
+        self,
+        source: str,
+        output_dir: str,
+        processor: BodycamProcessor,
+        detector=None,
+        window_s: int = 30,
+        segment_frames: int = 300,
+        idle_timeout_s: float = 30.0
+    ):
+        self.source = source
+        self.output_dir = Path(output_dir)
+        self.processor = processor
+        self.detector = detector
+        self.window_s = window_s
+        self.segment_frames = segment_frames
+        self.idle_timeout_s = idle_timeout_s
+
+        self.segments: List[Dict] = []
+        self.turns: List[tuple] = []
+        self.speakers = SpeakerTracker()
+        self._lock = threading.Lock()
+        self._errors: List[BaseException] = []
+
+    def run(self):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        threads = [threading.Thread(target=self._guard, args=(self._audio_loop,), name="live-audio")]
+        if self.detector is not None:
+            threads.append(threading.Thread(target=self._guard, args=(self._video_loop,), name="live-video"))
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if self._errors:
+            raise self._errors[0]
+
+    def _guard(self, loop):
+        try:
+            loop()
+        except BaseException as e:
+            logger.error(f"{threading.current_thread().name} failed: {e}", exc_info=True)
+            self._errors.append(e)
+
+    def _follow(self, *output_args) -> subprocess.Popen:
+        cmd = [
+            'ffmpeg', '-v', 'error',
+            '-follow', '1',
+            # how long the file may stop growing before it is treated as finished
+            '-rw_timeout', str(int(self.idle_timeout_s * 1_000_000)),
+            '-i', self.source,
+            *output_args,
+            'pipe:1'
+        ]
+        return subprocess.Popen(cmd, stdout=subprocess.PIPE)
+
+    def _check_exit(self, proc: subprocess.Popen, stream: str):
+        # a missing file or an MP4 without its moov atom yet makes ffmpeg exit
+        # at once; that is a failure, not an empty recording
+        if proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg exited with code {proc.returncode} reading {stream} from {self.source}")
+
+    # ------------------------------------------------------------------ #
+    # Audio: transcribe + diarize + publish per window
+    # ------------------------------------------------------------------ #
+
+    def _audio_loop(self):
+        proc = self._follow('-vn', '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 's16le')
+        window_bytes = self.window_s * SAMPLE_RATE * 2
+        offset = 0.0
+        try:
+            while True:
+                raw = proc.stdout.read(window_bytes)
+                if len(raw) < 2:
+                    break
+                audio = np.frombuffer(raw[:len(raw) // 2 * 2], dtype='<i2').astype(np.float32) / 32768.0
+                with metrics.span("live_window", kind="audio"):
+                    self._process_audio_window(audio, offset)
+                offset += len(audio) / SAMPLE_RATE
+                metrics.set_gauge("live_audio_seconds", offset)
+                logger.info(f"Live transcript updated through {offset:.1f}s")
+        finally:
+            proc.stdout.close()
+            proc.wait()
+        self._check_exit(proc, "audio")
+
+    def _process_audio_window(self, audio: np.ndarray, offset: float):
+        segments = self.processor.transcribe_window(audio, offset)
+        turns, embeddings = self.processor.diarize_window(audio, offset)
+        with self._lock:
+            self.segments.extend(s for s in segments if s['text'])
+            self.turns.extend(self.speakers.assign(turns, embeddings))
+            self._publish()
+
+    def _publish(self):
+        labels = self.speakers.labels()
+        labeled = align_segments(self.segments, self.turns, labels)
+
+        json_path = self.output_dir / "labeled_transcript.json"
+        write_atomic(json_path, json.dumps(labeled, separators=(',', ':')))
+        write_store(labeled, self.output_dir / "labeled_transcript.store")
+
+        lines = ["LABELED TRANSCRIPT (LIVE)", "=" * 60, ""]
+        lines += [f"[{s['start']:.2f}-{s['end']:.2f}] {s['speaker']}: {s['text']}" for s in labeled]
+        write_atomic(self.output_dir / "labeled_transcript.txt", "\n".join(lines) + "\n")
+
+    # ------------------------------------------------------------------ #
+    # Video: redact + append segments
+    # ------------------------------------------------------------------ #
+
+    def _probe_video(self):
+        deadline = time.monotonic() + self.idle_timeout_s
+        while True:
+            try:
+                out = subprocess.run(
+                    ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+                     '-show_entries', 'stream=width,height,r_frame_rate', '-of', 'json', self.source],
+                    capture_output=True, check=True, text=True
+                ).stdout
+                stream = json.loads(out)['streams'][0]
+                num, den = stream['r_frame_rate'].split('/')
+                return int(stream['width']), int(stream['height']), float(num) / float(den or 1)
+            except (subprocess.CalledProcessError, KeyError, IndexError, ValueError, ZeroDivisionError):
+                if time.monotonic() > deadline:
+                    raise IOError(f"No readable video stream in {self.source}")
+                time.sleep(1.0)
+
+    def _video_loop(self):
+        import cv2
+        from render import redact_frame
+
+        width, height, fps = self._probe_video()
+        frame_bytes = width * height * 3
+        segment_dir = self.output_dir / "segments"
+        segment_dir.mkdir(parents=True, exist_ok=True)
+        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+        manifest = {'fps': fps, 'width': width, 'height': height, 'segments': []}
+        (segment_dir / "segments.txt").unlink(missing_ok=True)
+
+        proc = self._follow('-an', '-f', 'rawvideo', '-pix_fmt', 'bgr24')
+        frame_index = 0
+        try:
+            eof = False
+            while not eof:
+                seg_path = segment_dir / f"segment_{len(manifest['segments']):05d}.mp4"
+                part_path = seg_path.with_suffix(".part.mp4")
+                writer = cv2.VideoWriter(str(part_path), fourcc, fps, (width, height))
+                written = 0
+                start = time.perf_counter()
+                try:
+                    while written < self.segment_frames:
+                        raw = proc.stdout.read(frame_bytes)
+                        if len(raw) < frame_bytes:
+                            eof = True
+                            break
+                        image = np.frombuffer(raw, dtype=np.uint8).reshape(height, width, 3)
+                        writer.write(redact_frame(self.detector, image))
+                        written += 1
+                finally:
+                    writer.release()
+
+                if not written:
+                    part_path.unlink(missing_ok=True)
+                    break
+                os.replace(part_path, seg_path)
+                manifest['segments'].append({
+                    'file': seg_path.name,
+                    'start': frame_index / fps,
+                    'end': (frame_index + written) / fps
+                })
+                frame_index += written
+                with open(segment_dir / "segments.txt", "a", encoding="utf-8") as f:
+                    f.write(f"file '{seg_path.name}'\n")
+                write_atomic(segment_dir / "manifest.json", json.dumps(manifest, indent=2))
+                metrics.set_gauge("render_fps", written / (time.perf_counter() - start))
+                metrics.inc("render_frames", written)
+                logger.info(f"Live video segment {seg_path.name} ready ({frame_index / fps:.1f}s)")
+        finally:
+            proc.stdout.close()
+            proc.wait()
+        self._check_exit(proc, "video")
+
+
+def align_segments(segments: List[Dict], turns: List[tuple], labels: Dict[int, str]) -> List[Dict]:
+    """Label each segment with the speaker whose turns overlap it the most."""
+    if not turns:
+        return [{**seg, 'speaker': "UNKNOWN"} for seg in segments]
+
+    turn_start = np.array([t[0] for t in turns])
+    turn_end = np.array([t[1] for t in turns])
+    turn_speaker = np.array([t[2] for t in turns])
+    n_speakers = int(turn_speaker.max()) + 1
+
+    labeled = []
+    for seg in segments:
+        overlap = np.clip(np.minimum(seg['end'], turn_end) - np.maximum(seg['start'], turn_start), 0, None)
+        per_speaker = np.bincount(turn_speaker, weights=overlap, minlength=n_speakers)
+        speaker = "UNKNOWN"
+        if per_speaker.max() > 0:
+            speaker = labels.get(int(per_speaker.argmax()), "UNKNOWN")
+        labeled.append({
+            'start': seg['start'],
+            'end': seg['end'],
+            'speaker': speaker,
+            'text': seg['text']
+        })
+    return labeled
+
+
+def main():
+
+    SOURCE = "body_worn_camera_live.mp4"
+    OUTPUT_DIR = "frontend/public/live"
+    REDACT_VIDEO = True
+
+    warnings.filterwarnings('ignore')
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    processor = BodycamProcessor(hf_token=os.getenv("HF_TOKEN"))
+    detector = None
+    if REDACT_VIDEO:
+        from detectors import load_detector
+        detector = load_detector()
+
+    LiveIngest(SOURCE, OUTPUT_DIR, processor, detector).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Span timings, counters and gauges for the processing pipeline.
+
+Instrumentation is off unless PRESAI_METRICS=1 is set (or enable() is called),
+in which case every record is appended as one JSON line to PRESAI_METRICS_PATH
+(default: metrics.jsonl). The Flask server replays that file to serve a
+Prometheus text endpoint.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+DEFAULT_METRICS_PATH = "metrics.jsonl"
+# minimum gap between emitted memory samples (a new peak is always emitted)
+MEMORY_SAMPLE_INTERVAL_S = 1.0
+
+_NULL_SPAN = nullcontext()
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    parts = []
+    for k, v in key:
+        v = v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class MetricsRegistry:
+
+    def __init__(self, path: Optional[str] = None, enabled: bool = False):
+        self.path = Path(path or DEFAULT_METRICS_PATH)
+        self.enabled = enabled
+        self.counters: Dict[Tuple[str, LabelKey], float] = {}
+        self.gauges: Dict[Tuple[str, LabelKey], float] = {}
+        # name/labels -> [count, sum, max]
+        self.summaries: Dict[Tuple[str, LabelKey], list] = {}
+        self._lock = threading.Lock()
+        self._fh = None
+        self._process = None
+        self._peak_rss = 0
+        self._last_memory_emit = 0.0
+
+    def enable(self, path: Optional[str] = None):
+        if path is not None:
+            self.close()
+            self.path = Path(path)
+        self.enabled = True
+
+    def close(self):
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    # ------------------------------------------------------------------ #
+    # Recording
+    # ------------------------------------------------------------------ #
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        self._apply("counter", name, value, _label_key(labels))
+        self._emit({"type": "counter", "name": name, "value": value, "labels": labels})
+
+    def set_gauge(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        self._apply("gauge", name, value, _label_key(labels))
+        self._emit({"type": "gauge", "name": name, "value": value, "labels": labels})
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        self._apply("summary", name, value, _label_key(labels))
+        self._emit({"type": "summary", "name": name, "value": value, "labels": labels})
+
+    def span(self, name: str, **labels):
+        """Time a block; records `<name>_seconds` and samples RSS on exit."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, labels)
+
+    @contextmanager
+    def _span(self, name: str, labels: Dict[str, object]) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            rss = self.sample_memory(emit=False)
+            self._apply("summary", f"{name}_seconds", duration, _label_key(labels))
+            self._emit({
+                "type": "span",
+                "name": name,
+                "value": duration,
+                "labels": labels,
+                "rss_bytes": rss,
+            })
+
+    def sample_memory(self, emit: bool = True) -> int:
+        """
+        Record current and peak resident set size of this process. With
+        `emit`, a memory record is also written (at most once per
+        MEMORY_SAMPLE_INTERVAL_S unless RSS hit a new peak), so peaks
+        between span boundaries reach the server.
+        """
+        if not self.enabled:
+            return 0
+        try:
+            if self._process is None:
+                import psutil
+                self._process = psutil.Process()
+            rss = self._process.memory_info().rss
+        except Exception:
+            return 0
+        new_peak = rss > self._peak_rss
+        if new_peak:
+            self._peak_rss = rss
+        self._apply("gauge", "process_rss_bytes", rss, ())
+        self._apply("gauge", "process_peak_rss_bytes", self._peak_rss, ())
+        now = time.monotonic()
+        if emit and (new_peak or now - self._last_memory_emit >= MEMORY_SAMPLE_INTERVAL_S):
+            self._last_memory_emit = now
+            self._emit({"type": "memory", "name": "process_rss_bytes", "value": rss, "rss_bytes": rss})
+        return rss
+
+    def record(self, kind: str, name: str, value: float, **labels):
+        """Update the in-memory aggregates only; nothing is written to disk."""
+        self._apply(kind, name, value, _label_key(labels))
+
+    def _apply(self, kind: str, name: str, value: float, key: LabelKey):
+        with self._lock:
+            if kind == "counter":
+                self.counters[(name, key)] = self.counters.get((name, key), 0) + value
+            elif kind == "gauge":
+                self.gauges[(name, key)] = value
+            else:
+                entry = self.summaries.get((name, key))
+                if entry is None:
+                    self.summaries[(name, key)] = [1, value, value]
+                else:
+                    entry[0] += 1
+                    entry[1] += value
+                    entry[2] = max(entry[2], value)
+
+    def _emit(self, record: Dict):
+        record["ts"] = time.time()
+        record["pid"] = os.getpid()
+        line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            if self._fh is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._fh = open(self.path, "a", encoding="utf-8", buffering=1)
+            self._fh.write(line)
+
+    # ------------------------------------------------------------------ #
+    # Export
+    # ------------------------------------------------------------------ #
+
+    def replay_jsonl(self, path: str, offset: int = 0) -> int:
+        """
+        Fold records from a JSON-lines file into this registry without
+        re-emitting them. Returns the byte offset to resume from next time.
+        """
+        path = Path(path)
+        if not path.exists():
+            return offset
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                offset += len(raw)
+                try:
+                    record = json.loads(raw)
+                except ValueError:
+                    continue
+                key = _label_key(record.get("labels") or {})
+                kind = record.get("type")
+                value = record.get("value", 0)
+                if kind in ("span", "memory"):
+                    if kind == "span":
+                        self._apply("summary", f"{record['name']}_seconds", value, key)
+                    rss = record.get("rss_bytes") or 0
+                    if rss:
+                        self._apply("gauge", "process_rss_bytes", rss, (("pid", str(record.get("pid"))),))
+                        peak = max(self.gauges.get(("process_peak_rss_bytes", ()), 0), rss)
+                        self._apply("gauge", "process_peak_rss_bytes", peak, ())
+                elif kind in ("counter", "gauge", "summary"):
+                    self._apply(kind, record["name"], value, key)
+        return offset
+
+    def render_prometheus(self, prefix: str = "presai_") -> str:
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+            summaries = sorted(self.summaries.items())
+
+        typed = set()
+        for (name, key), value in counters:
+            metric = f"{prefix}{name}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_format_labels(key)} {value}")
+
+        for (name, key), value in gauges:
+            metric = f"{prefix}{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} gauge")
+                typed.add(metric)
+            lines.append(f"{metric}{_format_labels(key)} {value}")
+
+        for (name, key), (count, total, _) in summaries:
+            metric = f"{prefix}{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} summary")
+                typed.add(metric)
+            labels = _format_labels(key)
+            lines.append(f"{metric}_count{labels} {count}")
+            lines.append(f"{metric}_sum{labels} {total}")
+
+        # a summary family may only hold _count/_sum/quantiles, so the max is
+        # exported as a separate gauge family
+        for (name, key), (_, _, peak) in summaries:
+            metric = f"{prefix}{name}_max"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} gauge")
+                typed.add(metric)
+            lines.append(f"{metric}{_format_labels(key)} {peak}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry(
+    path=os.getenv("PRESAI_METRICS_PATH", DEFAULT_METRICS_PATH),
+    enabled=os.getenv("PRESAI_METRICS", "0").lower() in ("1", "true", "yes"),
+)
+
+span = registry.span
+inc = registry.inc
+set_gauge = registry.set_gauge
+observe = registry.observe
+sample_memory = registry.sample_memory
+enable = registry.enable
@@ -1,8 +1,17 @@
-import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 
-df_lac_salaries = pd.read_csv("./datasets/la_county/la_county_employee_salaries.csv")
+import salary_analytics
 
-plt.plot(df_lac_salaries["Base Earnings"])
-plt.show()
\ No newline at end of file
+def main():
+    # first run converts the CSV to Parquet; later runs scan the cached file
+    lf_lac_salaries = salary_analytics.scan(salary_analytics.DEFAULT_CSV)
+
+    print(salary_analytics.summarize(lf_lac_salaries, by=("department",), top=20))
+
+    series = salary_analytics.downsample_series(lf_lac_salaries, "Base Earnings")
+    plt.fill_between(series["row"], series["min"], series["max"], alpha=0.3)
+    plt.plot(series["row"], series["mean"])
+    plt.show()
+
+if __name__ == "__main__":
+    main()
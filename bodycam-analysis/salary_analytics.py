@@ -0,0 +1,147 @@
+"""
+Streaming analytics over the LA County employee salary export.
+
+Everything is built on polars LazyFrames and collected with the streaming
+engine, so a multi-GB CSV is aggregated in bounded memory. The CSV can be
+converted once to a Parquet file next to it; later scans read the Parquet
+(columnar, typed, compressed), which is what makes repeated analyses fast.
+
+    lf = scan(DEFAULT_CSV)
+    by_department = summarize(lf, by=("department", "year"))
+    series = downsample_series(lf, "Base Earnings")
+
+Column names differ between yearly exports, so grouping keys are given by
+role ("department", "year", "title") and matched against the header.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+import polars as pl
+
+import metrics
+
+DEFAULT_CSV = "./datasets/la_county/la_county_employee_salaries.csv"
+DEFAULT_EARNINGS = "Base Earnings"
+# header names seen for each grouping role, in order of preference
+ROLE_COLUMNS = {
+    "year": ("Year", "Fiscal Year", "Calendar Year"),
+    "department": ("Department Title", "Department", "Department Name"),
+    "title": ("Job Class Title", "Position Title", "Job Title", "Title"),
+}
+# points kept for plotting; enough for any screen width
+MAX_PLOT_POINTS = 2000
+
+
+def _clean(lf: pl.LazyFrame) -> pl.LazyFrame:
+    """Type the all-string CSV scan: money columns to floats, year to int."""
+    names = lf.collect_schema().names()
+    exprs = [
+        # "$1,234.56" -> 1234.56; blanks and junk become null instead of failing
+        pl.col(c).str.replace_all(r"[$,\s]", "").cast(pl.Float64, strict=False)
+        for c in names if c.endswith("Earnings")
+    ]
+    year = resolve_columns(names).get("year")
+    if year:
+        exprs.append(pl.col(year).str.strip_chars().cast(pl.Int32, strict=False))
+    return lf.with_columns(exprs)
+
+
+def resolve_columns(names: Sequence[str]) -> Dict[str, str]:
+    """Map grouping roles to the header names present in this file."""
+    resolved = {}
+    for role, candidates in ROLE_COLUMNS.items():
+        for candidate in candidates:
+            if candidate in names:
+                resolved[role] = candidate
+                break
+    return resolved
+
+
+def scan_csv(csv_path: str = DEFAULT_CSV) -> pl.LazyFrame:
+    # every column as text: no inference pass, and no type errors deep in the file
+    return _clean(pl.scan_csv(csv_path, infer_schema=False))
+
+
+def to_parquet(csv_path: str = DEFAULT_CSV, parquet_path: Optional[str] = None) -> str:
+    """Convert the CSV to Parquet once; reused until the CSV changes."""
+    parquet_path = Path(parquet_path or Path(csv_path).with_suffix(".parquet"))
+    if parquet_path.exists() and parquet_path.stat().st_mtime_ns >= os.stat(csv_path).st_mtime_ns:
+        return str(parquet_path)
+
+    tmp_path = parquet_path.with_name(parquet_path.name + ".tmp")
+    with metrics.span("pipeline_step", step="salary_parquet"):
+        scan_csv(csv_path).sink_parquet(tmp_path)
+    os.replace(tmp_path, parquet_path)
+    return str(parquet_path)
+
+
+def scan(csv_path: str = DEFAULT_CSV, cache: bool = True) -> pl.LazyFrame:
+    if cache:
+        return pl.scan_parquet(to_parquet(csv_path))
+    return scan_csv(csv_path)
+
+
+def summarize(
+    lf: pl.LazyFrame,
+    by: Sequence[str] = ("department",),
+    earnings: str = DEFAULT_EARNINGS,
+    year: Optional[int] = None,
+    top: Optional[int] = None
+) -> pl.DataFrame:
+    """
+    Headcount and earnings statistics of `earnings` grouped by roles in `by`
+    ("department", "year", "title"), largest total first. `year` filters to
+    one year; `top` keeps only the largest groups.
+    """
+    columns = resolve_columns(lf.collect_schema().names())
+    missing = [role for role in list(by) + (["year"] if year is not None else []) if role not in columns]
+    if missing:
+        raise ValueError(f"No column found for {missing}; expected one of {[ROLE_COLUMNS[m] for m in missing]}")
+
+    if year is not None:
+        lf = lf.filter(pl.col(columns["year"]) == year)
+    keys = [pl.col(columns[role]).alias(role) for role in by]
+    value = pl.col(earnings)
+    lf = (
+        lf.group_by(keys)
+        .agg(
+            pl.len().alias("employees"),
+            value.sum().alias("total"),
+            value.mean().alias("mean"),
+            value.min().alias("min"),
+            value.max().alias("max"),
+        )
+        .sort("total", descending=True)
+    )
+    if top:
+        lf = lf.head(top)
+    with metrics.span("pipeline_step", step="salary_summary", by=",".join(by)):
+        return lf.collect(engine="streaming")
+
+
+def downsample_series(
+    lf: pl.LazyFrame,
+    column: str = DEFAULT_EARNINGS,
+    max_points: int = MAX_PLOT_POINTS
+) -> pl.DataFrame:
+    """
+    `column` against row number, reduced to at most `max_points` buckets of
+    consecutive rows. Each bucket keeps mean, min and max, so outliers still
+    show up in the plot's envelope.
+    """
+    rows = lf.select(pl.len()).collect(engine="streaming").item()
+    bucket = max(1, -(-rows // max_points))
+    return (
+        lf.select(pl.col(column))
+        .with_row_index("row")
+        .group_by((pl.col("row") // bucket * bucket).alias("row"))
+        .agg(
+            pl.col(column).mean().alias("mean"),
+            pl.col(column).min().alias("min"),
+            pl.col(column).max().alias("max"),
+        )
+        .sort("row")
+        .collect(engine="streaming")
+    )
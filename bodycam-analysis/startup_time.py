@@ -0,0 +1,137 @@
+"""
+Startup-time check for the server and the processing modules.
+
+Each module is imported in a fresh interpreter (so nothing is cached from a
+previous import) and the median wall time over a few runs is compared with a
+budget. The server is also started for real and timed until /health answers
+(live) and until /health/ready answers 200 (ready).
+
+    python startup_time.py            # imports + server
+    python startup_time.py --no-server
+
+Exits non-zero if any import fails or is over budget, or the server's
+time-to-live is over budget, so it can gate CI. Results are also recorded as `startup_seconds` metrics.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import metrics
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# module -> (directory it is imported from, budget in seconds)
+IMPORT_BUDGETS = {
+    "server": ("frontend", 1.0),
+    "agent": ("frontend", 0.3),
+    "reason": ("video", 0.1),
+    "render": ("video", 1.0),
+    "transcribe_and_diarize": (".", 0.5),
+    "live_ingest": (".", 0.5),
+}
+SERVER_LIVE_BUDGET_S = 1.0
+SERVER_READY_TIMEOUT_S = 30.0
+SERVER_PORT = 5055
+
+
+def time_import(module, directory, runs):
+    code = (
+        "import sys, time; "
+        f"sys.path.insert(0, {os.path.join(ROOT, directory)!r}); "
+        "t = time.perf_counter(); "
+        f"import {module}; "
+        "print(time.perf_counter() - t)"
+    )
+    samples = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=os.path.join(ROOT, directory), capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            return None, proc.stderr.strip().splitlines()[-1]
+        samples.append(float(proc.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples), None
+
+
+def wait_for(url, proc, timeout, want_status=200):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline and proc.poll() is None:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resp:
+                if resp.status == want_status:
+                    return True
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.02)
+    return False
+
+
+def time_server():
+    env = {**os.environ, "PORT": str(SERVER_PORT)}
+    base = f"http://localhost:{SERVER_PORT}"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "server.py"], cwd=os.path.join(ROOT, "frontend"), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        live = ready = None
+        if wait_for(base + "/health", proc, SERVER_READY_TIMEOUT_S):
+            live = time.perf_counter() - start
+            if wait_for(base + "/health/ready", proc, SERVER_READY_TIMEOUT_S):
+                ready = time.perf_counter() - start
+        return live, ready
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--runs", type=int, default=5, help="imports per module (median is reported)")
+    parser.add_argument("--no-server", action="store_true", help="skip starting the server")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results, failed = {}, False
+    for module, (directory, budget) in IMPORT_BUDGETS.items():
+        seconds, error = time_import(module, directory, args.runs)
+        over = seconds is not None and seconds > budget
+        failed |= over or error is not None
+        results[module] = {"seconds": seconds, "budget": budget, "error": error}
+        if seconds is not None:
+            metrics.observe("startup_seconds", seconds, module=module)
+        if not args.json:
+            status = f"error: {error}" if error else f"{seconds * 1000:7.1f} ms" + ("  OVER BUDGET" if over else "")
+            print(f"import {module:<24} {status}  (budget {budget * 1000:.0f} ms)")
+
+    if not args.no_server:
+        live, ready = time_server()
+        failed |= live is None or live > SERVER_LIVE_BUDGET_S
+        results["server_process"] = {"live": live, "ready": ready, "budget": SERVER_LIVE_BUDGET_S}
+        if live is not None:
+            metrics.observe("startup_seconds", live, module="server_process", phase="live")
+        if ready is not None:
+            metrics.observe("startup_seconds", ready, module="server_process", phase="ready")
+        if not args.json:
+            fmt = lambda s: f"{s * 1000:.0f} ms" if s is not None else "never"
+            print(f"server live after {fmt(live)} (budget {SERVER_LIVE_BUDGET_S * 1000:.0f} ms), ready after {fmt(ready)}")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
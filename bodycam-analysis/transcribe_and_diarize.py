@@ -1,26 +1,52 @@
 
 import os
 import json
+import math
 import logging
 from pathlib import Path
 from typing import Dict, List, Tuple
 import warnings
 
-warnings.filterwarnings('ignore')
+import numpy as np
+
+import metrics
+from checkpoint import JobCheckpoint, fingerprint
+from transcript_store import write_store
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+# segments built from word timestamps (redaction runs) break on pauses and at Whisper's 30s chunk length
+WORD_SEGMENT_MAX_GAP_S = 1.0
+WORD_SEGMENT_MAX_S = 30.0
+
 
 class BodycamProcessor:
     
-    def __init__(self, hf_token: str = None):
+    WHISPER_MODEL_ID = "openai/whisper-medium"
+    # Audio is transcribed (and checkpointed) in windows of this many seconds.
+    # Keep it a multiple of the pipeline's 30s chunk length.
+    TRANSCRIBE_WINDOW_S = 600
+    
+    # fast path for enrolled officers: voiceprint match on short sliding windows
+    EMBEDDING_MODEL_ID = "pyannote/wespeaker-voxceleb-resnet34-LM"
+    WINDOW_MATCH_THRESHOLD = 0.4
+    SUBJECT_CLUSTER_THRESHOLD = 0.5
+    
+    def __init__(
+        self,
+        hf_token: str = None,
+        voiceprint_path: str = "voiceprints.npz",
+        fast_known_speakers: bool = True
+    ):
         self.hf_token = hf_token
         self.whisper_model = None
         self.diarization_pipeline = None
+        self.voiceprint_path = voiceprint_path
+        self.fast_known_speakers = fast_known_speakers
+        self.voiceprints = None
+        self.vad_pipeline = None
+        self.embedding_inference = None
+        self.embedding_whole = None
         
     def step1_convert_mp4_to_wav(self, mp4_path: str) -> str:
         logger.info("=" * 60)
@@ -44,23 +70,29 @@ class BodycamProcessor:
         logger.info(f"Input: {mp4_path}")
         logger.info(f"Output: {wav_path}")
         
+        # Reuse the WAV from an earlier run: rewriting it would change its
+        # mtime and invalidate the transcription checkpoints keyed on it.
+        # It is only ever renamed into place complete, so existing means whole.
+        if wav_path.exists() and wav_path.stat().st_mtime_ns >= mp4_path.stat().st_mtime_ns:
+            logger.info(f"✓ WAV file up to date, skipping conversion: {wav_path}")
+            return str(wav_path)
+        
         logger.info("Extracting audio...")
-        video = VideoFileClip(str(mp4_path))
-        video.audio.write_audiofile(
-            str(wav_path),
-            codec='pcm_s16le',
-            fps=16000
-        )
-        video.close()
+        tmp_path = wav_path.with_name(wav_path.stem + ".tmp.wav")
+        with metrics.span("pipeline_step", step="convert"):
+            video = VideoFileClip(str(mp4_path))
+            video.audio.write_audiofile(
+                str(tmp_path),
+                codec='pcm_s16le',
+                fps=16000
+            )
+            video.close()
+        os.replace(tmp_path, wav_path)
         
         logger.info(f"✓ WAV file created: {wav_path}")
         return str(wav_path)
     
-    def step2_transcribe_audio(self, wav_path: str) -> Tuple[str, List[Dict]]:
-        logger.info("=" * 60)
-        logger.info("STEP 2: Transcribing Audio with Whisper")
-        logger.info("=" * 60)
-        
+    def _load_whisper(self):
         try:
             import torch
             from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor, pipeline
@@ -75,62 +107,148 @@ class BodycamProcessor:
                 "pip install torch transformers accelerate"
             )
         
-        wav_path = Path(wav_path)
-        
         if self.whisper_model is None:
             logger.info("Loading Whisper model (openai/whisper-mediu-v3)...")
             
             device = "cuda:0" if torch.cuda.is_available() else "cpu"
             torch_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
             
-            model_id = "openai/whisper-medium"
-            
-            model = AutoModelForSpeechSeq2Seq.from_pretrained(
-                model_id,
-                torch_dtype=torch_dtype,
-                low_cpu_mem_usage=True,
-                use_safetensors=True
-            )
-            model.to(device)
-            
-            processor = AutoProcessor.from_pretrained(model_id)
+            model_id = self.WHISPER_MODEL_ID
             
-            self.whisper_model = pipeline(
-                "automatic-speech-recognition",
-                model=model,
-                tokenizer=processor.tokenizer,
-                feature_extractor=processor.feature_extractor,
-                max_new_tokens=128,
-                chunk_length_s=30,
-                batch_size=16,
-                return_timestamps=True,
-                torch_dtype=torch_dtype,
-                device=device,
-            )
+            with metrics.span("model_load", model=model_id, device=device):
+                model = AutoModelForSpeechSeq2Seq.from_pretrained(
+                    model_id,
+                    torch_dtype=torch_dtype,
+                    low_cpu_mem_usage=True,
+                    use_safetensors=True
+                )
+                model.to(device)
+                
+                processor = AutoProcessor.from_pretrained(model_id)
+                
+                self.whisper_model = pipeline(
+                    "automatic-speech-recognition",
+                    model=model,
+                    tokenizer=processor.tokenizer,
+                    feature_extractor=processor.feature_extractor,
+                    max_new_tokens=128,
+                    chunk_length_s=30,
+                    batch_size=16,
+                    return_timestamps=True,
+                    torch_dtype=torch_dtype,
+                    device=device,
+                )
             
             logger.info(f"✓ Whisper model loaded on {device}")
+    
+    def _transcribe_windows(self, wav_path: Path, return_timestamps, job: str) -> List[Dict]:
+        """
+        Run Whisper over `wav_path` one window at a time, checkpointing the
+        accumulated chunks after each window so a restarted job resumes.
+        `return_timestamps` is passed through (True for segments, "word" for words).
+        """
+        import librosa
+        
+        audio_seconds = librosa.get_duration(path=str(wav_path))
+        window_s = self.TRANSCRIBE_WINDOW_S
+        n_windows = max(1, math.ceil(audio_seconds / window_s))
+        metrics.set_gauge("audio_duration_seconds", audio_seconds, source=wav_path.name)
+        
+        checkpoint = JobCheckpoint(
+            wav_path.with_suffix(f'.{job}.ckpt.json'),
+            fingerprint(
+                str(wav_path),
+                model=self.WHISPER_MODEL_ID,
+                window_s=window_s,
+                timestamps=str(return_timestamps)
+            )
+        )
+        state = checkpoint.load() or {'window': 0, 'segments': []}
+        segments = state['segments']
+        if state['window'] > 0:
+            logger.info(
+                f"Resuming from checkpoint at {state['window'] * window_s}s "
+                f"({len(segments)} segments already transcribed)"
+            )
         
-        logger.info("Loading audio file into memory (avoiding TorchCodec on Windows)...")
-        audio_array, sample_rate = librosa.load(str(wav_path), sr=16000)
-        logger.info(f"✓ Audio loaded: {len(audio_array)/sample_rate:.2f} seconds")
+        logger.info(f"Transcribing {audio_seconds:.2f}s of audio in {n_windows} window(s) (this may take several minutes)...")
+        for window in range(state['window'], n_windows):
+            offset = window * window_s
+            # Load one window at a time (avoiding TorchCodec on Windows)
+            with metrics.span("audio_load"):
+                audio_array, sample_rate = librosa.load(
+                    str(wav_path), sr=16000, offset=offset, duration=window_s
+                )
+            if len(audio_array) == 0:
+                break
+            with metrics.span("pipeline_step", step=job):
+                segments.extend(self.transcribe_window(audio_array, offset, return_timestamps))
+            window_end = offset + len(audio_array) / sample_rate
+            
+            checkpoint.save({'window': window + 1, 'segments': segments})
+            logger.info(f"  window {window + 1}/{n_windows} done ({window_end:.1f}s)")
         
-        logger.info("Transcribing audio (this may take several minutes)...")
-        result = self.whisper_model(audio_array)
+        return segments
+    
+    def transcribe_words(self, wav_path: str) -> List[Dict]:
+        """Word-level Whisper pass; also saved as session_words.json."""
+        self._load_whisper()
+        wav_path = Path(wav_path)
+        words = self._transcribe_windows(wav_path, return_timestamps="word", job='words')
         
+        words_path = wav_path.parent / "session_words.json"
+        with open(words_path, 'w', encoding='utf-8') as f:
+            json.dump(words, f, separators=(',', ':'))
+        logger.info(f"✓ Word timestamps saved: {words_path} ({len(words)} words)")
+        return words
+    
+    @staticmethod
+    def words_to_segments(
+        words: List[Dict],
+        max_gap: float = WORD_SEGMENT_MAX_GAP_S,
+        max_duration: float = WORD_SEGMENT_MAX_S
+    ) -> List[Dict]:
+        """
+        Group word timestamps into transcript segments, breaking at sentence
+        ends, pauses longer than `max_gap` and segments longer than `max_duration`.
+        """
         segments = []
-        if 'chunks' in result:
-            for chunk in result['chunks']:
-                segments.append({
-                    'start': chunk['timestamp'][0],
-                    'end': chunk['timestamp'][1],
-                    'text': chunk['text'].strip()
-                })
+        current = None
+        for word in words:
+            if not word['text']:
+                continue
+            if current is not None and (
+                word['start'] - current['end'] > max_gap
+                or word['end'] - current['start'] > max_duration
+                or current['text'].endswith(('.', '?', '!'))
+            ):
+                segments.append(current)
+                current = None
+            if current is None:
+                current = dict(word)
+            else:
+                current['end'] = word['end']
+                current['text'] += " " + word['text']
+        if current is not None:
+            segments.append(current)
+        return segments
+    
+    def step2_transcribe_audio(self, wav_path: str, words: List[Dict] = None) -> Tuple[str, List[Dict]]:
+        """
+        Segment-level transcript. If word timestamps are passed (from
+        transcribe_words), segments are built from them instead of running
+        Whisper a second time.
+        """
+        logger.info("=" * 60)
+        logger.info("STEP 2: Transcribing Audio with Whisper")
+        logger.info("=" * 60)
+        
+        wav_path = Path(wav_path)
+        if words is not None:
+            segments = self.words_to_segments(words)
         else:
-            segments.append({
-                'start': 0.0,
-                'end': 0.0,
-                'text': result['text'].strip()
-            })
+            self._load_whisper()
+            segments = self._transcribe_windows(wav_path, return_timestamps=True, job='transcribe')
         
         transcript_path = wav_path.parent / "session_transcript_raw.txt"
         with open(transcript_path, 'w', encoding='utf-8') as f:
@@ -141,10 +259,38 @@ class BodycamProcessor:
         
         logger.info(f"✓ Raw transcript saved: {transcript_path}")
         logger.info(f"✓ Transcribed {len(segments)} segments")
+        metrics.inc("transcript_segments", len(segments))
         
         return str(transcript_path), segments
     
-    def step3_diarize_speakers(self, wav_path: str) -> Tuple[object, Dict[str, str]]:
+    def transcribe_window(self, audio_array, offset: float, return_timestamps=True) -> List[Dict]:
+        """Transcribe one 16 kHz mono window whose first sample is at `offset` seconds."""
+        self._load_whisper()
+        result = self.whisper_model(audio_array, return_timestamps=return_timestamps)
+        window_end = offset + len(audio_array) / 16000
+        return self._offset_segments(result, offset, window_end)
+    
+    @staticmethod
+    def _offset_segments(result: Dict, offset: float, window_end: float) -> List[Dict]:
+        if 'chunks' not in result:
+            return [{
+                'start': offset,
+                'end': window_end,
+                'text': result['text'].strip()
+            }]
+        
+        segments = []
+        for chunk in result['chunks']:
+            start, end = chunk['timestamp']
+            segments.append({
+                'start': round(offset + (start or 0.0), 3),
+                # Whisper leaves the end of a window's last chunk open
+                'end': round(offset + end, 3) if end is not None else round(window_end, 3),
+                'text': chunk['text'].strip()
+            })
+        return segments
+    
+    def step3_diarize_speakers(self, wav_path: str, officer_id: str = None) -> Tuple[object, Dict[str, str]]:
         logger.info("=" * 60)
         logger.info("STEP 3: Speaker Diarization")
         logger.info("=" * 60)
@@ -159,16 +305,29 @@ class BodycamProcessor:
         except ImportError:
             raise ImportError("pyannote.audio not installed. Run: pip install pyannote.audio")
         
+        if self.voiceprints is None:
+            from voiceprints import VoiceprintStore
+            self.voiceprints = VoiceprintStore(self.voiceprint_path)
+        
+        if officer_id is not None and self.fast_known_speakers and officer_id in self.voiceprints:
+            logger.info(f"Officer {officer_id} is enrolled, using voiceprint fast path...")
+            result = self._diarize_known_officer(wav_path, officer_id)
+            if result is not None:
+                return result
+            logger.info("Officer voice not found in fast path, falling back to full diarization")
+        
         if self.diarization_pipeline is None:
             logger.info("Loading pyannote diarization pipeline...")
-            self.diarization_pipeline = Pipeline.from_pretrained(
-                "pyannote/speaker-diarization-3.1",
-                use_auth_token=self.hf_token
-            )
+            with metrics.span("model_load", model="pyannote/speaker-diarization-3.1"):
+                self.diarization_pipeline = Pipeline.from_pretrained(
+                    "pyannote/speaker-diarization-3.1",
+                    use_auth_token=self.hf_token
+                )
             logger.info("✓ Diarization pipeline loaded")
         
         logger.info("Analyzing speakers (this may take several minutes)...")
-        diarization = self.diarization_pipeline(wav_path)
+        with metrics.span("pipeline_step", step="diarize"):
+            diarization, centroids = self.diarization_pipeline(wav_path, return_embeddings=True)
         
         speaker_durations = {}
         for turn, _, speaker in diarization.itertracks(yield_label=True):
@@ -176,32 +335,215 @@ class BodycamProcessor:
             speaker_durations[speaker] = speaker_durations.get(speaker, 0) + duration
         
         logger.info(f"✓ Detected {len(speaker_durations)} speakers")
+        metrics.set_gauge("speakers_detected", len(speaker_durations))
         
         speaker_mapping = {}
-        if len(speaker_durations) == 0:
-            logger.warning("No speakers detected")
-        elif len(speaker_durations) == 1:
-            speaker = list(speaker_durations.keys())[0]
+        labels = diarization.labels()
+        
+        # Known voices first: enrolled officers are labelled from their voiceprint
+        # instead of by who talked the most
+        known_names = self.voiceprints.labels_for(officer_id)
+        for label, (badge, similarity) in zip(labels, self.voiceprints.match(centroids)):
+            if badge is not None:
+                speaker_mapping[label] = known_names[badge]
+                logger.info(f"  {label} → {known_names[badge]} (voiceprint {badge}, sim {similarity:.2f})")
+        
+        sorted_speakers = sorted(
+            ((s, d) for s, d in speaker_durations.items() if s not in speaker_mapping),
+            key=lambda x: x[1],
+            reverse=True
+        )
+        officer_unassigned = "OFFICER" not in speaker_mapping.values()
+        # Without a voiceprint for the wearer, fall back to "longest speaker is the officer".
+        # This is only a label; voiceprints come from enroll_officer(), never from a guess.
+        if sorted_speakers and officer_unassigned and (officer_id is None or officer_id not in self.voiceprints):
+            speaker, duration = sorted_speakers.pop(0)
             speaker_mapping[speaker] = "OFFICER"
-            logger.info(f"  {speaker} → OFFICER (only speaker)")
-        else:
-            sorted_speakers = sorted(
-                speaker_durations.items(),
-                key=lambda x: x[1],
-                reverse=True
-            )
-            speaker_mapping[sorted_speakers[0][0]] = "OFFICER"
-            speaker_mapping[sorted_speakers[1][0]] = "SUBJECT_1"
-            
-            logger.info(f"  {sorted_speakers[0][0]} → OFFICER ({sorted_speakers[0][1]:.1f}s)")
-            logger.info(f"  {sorted_speakers[1][0]} → SUBJECT_1 ({sorted_speakers[1][1]:.1f}s)")
-            
-            for i, (speaker, duration) in enumerate(sorted_speakers[2:], start=2):
-                speaker_mapping[speaker] = f"SUBJECT_{i}"
-                logger.info(f"  {speaker} → SUBJECT_{i} ({duration:.1f}s)")
+            logger.info(f"  {speaker} → OFFICER ({duration:.1f}s)")
+        
+        for i, (speaker, duration) in enumerate(sorted_speakers, start=1):
+            speaker_mapping[speaker] = f"SUBJECT_{i}"
+            logger.info(f"  {speaker} → SUBJECT_{i} ({duration:.1f}s)")
+        
+        if not speaker_durations:
+            logger.warning("No speakers detected")
         
         return diarization, speaker_mapping
     
+    def enroll_officer(
+        self,
+        officer_id: str,
+        wav_path: str,
+        segments: List[Tuple[float, float]] = None
+    ) -> int:
+        """
+        Enroll (or extend) `officer_id`'s voiceprint from a reference recording
+        known to be that officer, e.g. a supervised read-out. `segments` are the
+        (start, end) seconds in which only the officer speaks; None means the
+        whole file. This is the only place voiceprints are written: processing
+        footage labels speakers from the store but never updates it.
+        Returns the number of segments embedded.
+        """
+        from pyannote.audio import Audio
+        from pyannote.core import Segment
+        
+        if not self.hf_token:
+            raise ValueError("Enrolling a voiceprint needs a Hugging Face token for the embedding model")
+        if self.voiceprints is None:
+            from voiceprints import VoiceprintStore
+            self.voiceprints = VoiceprintStore(self.voiceprint_path)
+        self._load_embedding_model()
+        
+        audio_duration = Audio().get_duration(wav_path)
+        regions = [Segment(0.0, audio_duration)] if segments is None else [
+            Segment(max(0.0, start), min(audio_duration, end)) for start, end in segments
+        ]
+        regions = [region for region in regions if region.duration > 0]
+        if not regions:
+            raise ValueError(f"No audio to enroll from in {wav_path}")
+        
+        with metrics.span("pipeline_step", step="enroll"):
+            vectors = np.stack([self._embed_region(wav_path, region, audio_duration) for region in regions])
+            weights = np.array([region.duration for region in regions])
+            usable = np.all(np.isfinite(vectors), axis=1)
+            if not np.any(usable):
+                raise ValueError(f"No usable speech embedding in {wav_path}")
+            mean = np.average(vectors[usable], axis=0, weights=weights[usable])
+            self.voiceprints.enroll(officer_id, mean, float(weights[usable].sum()))
+            self.voiceprints.save()
+        logger.info(f"✓ Voiceprint for officer {officer_id} enrolled from {int(usable.sum())} segment(s)")
+        return int(usable.sum())
+    
+    def _load_embedding_model(self):
+        if self.embedding_inference is not None:
+            return
+        from pyannote.audio import Inference, Model
+        
+        with metrics.span("model_load", model=self.EMBEDDING_MODEL_ID):
+            embedding_model = Model.from_pretrained(self.EMBEDDING_MODEL_ID, use_auth_token=self.hf_token)
+            self.embedding_inference = Inference(embedding_model, window="sliding", duration=2.0, step=1.0)
+            self.embedding_whole = Inference(embedding_model, window="whole")
+    
+    def _embed_region(self, wav_path: str, region, audio_duration: float) -> np.ndarray:
+        """One embedding for `region`, widened to at least a sliding window's length."""
+        from pyannote.core import Segment
+        
+        min_window = self.embedding_inference.duration
+        if region.duration < min_window:
+            # embed the 2s around it, clamped to the file
+            start = max(0.0, min(region.middle - min_window / 2, audio_duration - min_window))
+            region = Segment(start, min(audio_duration, start + min_window))
+        return np.asarray(self.embedding_whole.crop(wav_path, region)).reshape(-1)
+    
+    def _diarize_known_officer(self, wav_path: str, officer_id: str):
+        """
+        Diarize without clustering: voice activity detection, then one speaker
+        embedding per short sliding window over speech only (regions shorter than
+        a window get one embedding of the window centred on them). Windows matching an
+        enrolled voiceprint get that officer's label; the rest are grouped into
+        subjects by a single greedy pass. Returns None if the wearer's voice
+        is not found, so the caller can run the full pipeline instead.
+        """
+        from pyannote.audio import Audio, Model
+        from pyannote.audio.pipelines import VoiceActivityDetection
+        from pyannote.core import Annotation, Segment
+        from voiceprints import greedy_cluster
+        
+        if self.vad_pipeline is None:
+            with metrics.span("model_load", model="pyannote/segmentation-3.0"):
+                segmentation = Model.from_pretrained("pyannote/segmentation-3.0", use_auth_token=self.hf_token)
+                self.vad_pipeline = VoiceActivityDetection(segmentation=segmentation)
+                self.vad_pipeline.instantiate({"min_duration_on": 0.0, "min_duration_off": 0.0})
+        self._load_embedding_model()
+        
+        # each sliding window speaks for the `step` seconds around its centre
+        half_step = self.embedding_inference.step / 2
+        min_window = self.embedding_inference.duration
+        with metrics.span("pipeline_step", step="diarize_fast"):
+            speech = self.vad_pipeline(wav_path).get_timeline().support()
+            audio_duration = Audio().get_duration(wav_path)
+            
+            # spans: the stretch of speech each embedding labels
+            spans, vectors = [], []
+            for region in speech:
+                if region.duration < min_window:
+                    # too short for a sliding window: embed the 2s around it
+                    # but label only the region itself
+                    spans.append(region)
+                    vectors.append(self._embed_region(wav_path, region, audio_duration))
+                    continue
+                features = self.embedding_inference.crop(wav_path, region)
+                for window, vector in features:
+                    centre = window.middle
+                    spans.append(Segment(centre - half_step, centre + half_step))
+                    vectors.append(vector)
+        
+        if not vectors:
+            return None
+        vectors = np.stack(vectors)
+        
+        sims = self.voiceprints.similarity(vectors)
+        best = sims.argmax(axis=1)
+        known = sims[np.arange(len(best)), best] >= self.WINDOW_MATCH_THRESHOLD
+        known_names = self.voiceprints.labels_for(officer_id)
+        officer_index = self.voiceprints.ids.index(str(officer_id))
+        if not np.any(known & (best == officer_index)):
+            return None
+        
+        subjects = np.full(len(vectors), -1)
+        if np.any(~known):
+            subjects[~known] = greedy_cluster(vectors[~known], self.SUBJECT_CLUSTER_THRESHOLD)
+        # number subjects by how much they talk, like the full pipeline
+        order = np.argsort(-np.bincount(subjects[~known])) if np.any(~known) else []
+        subject_names = {int(c): f"SUBJECT_{rank}" for rank, c in enumerate(order, start=1)}
+        
+        diarization = Annotation()
+        for i, span in enumerate(spans):
+            if known[i]:
+                label = known_names[self.voiceprints.ids[best[i]]]
+            else:
+                label = subject_names[int(subjects[i])]
+            diarization[span] = label
+        diarization = diarization.support()
+        
+        speaker_mapping = {label: label for label in diarization.labels()}
+        logger.info(f"✓ Detected {len(speaker_mapping)} speakers (fast path)")
+        for label in sorted(speaker_mapping):
+            logger.info(f"  {label} ({diarization.label_duration(label):.1f}s)")
+        metrics.set_gauge("speakers_detected", len(speaker_mapping))
+        return diarization, speaker_mapping
+    
+    def diarize_window(self, audio_array, offset: float):
+        """
+        Diarize one in-memory 16 kHz mono window. Returns (turns, embeddings)
+        where turns are (start, end, local_label) in absolute seconds and
+        embeddings maps each local label to its speaker centroid.
+        """
+        if not self.hf_token:
+            return [], {}
+        if self.diarization_pipeline is None:
+            from pyannote.audio import Pipeline
+            with metrics.span("model_load", model="pyannote/speaker-diarization-3.1"):
+                self.diarization_pipeline = Pipeline.from_pretrained(
+                    "pyannote/speaker-diarization-3.1",
+                    use_auth_token=self.hf_token
+                )
+        
+        import torch
+        waveform = torch.from_numpy(audio_array).unsqueeze(0)
+        diarization, centroids = self.diarization_pipeline(
+            {'waveform': waveform, 'sample_rate': 16000},
+            return_embeddings=True
+        )
+        turns = [
+            (offset + turn.start, offset + turn.end, speaker)
+            for turn, _, speaker in diarization.itertracks(yield_label=True)
+        ]
+        embeddings = {
+            label: centroids[i] for i, label in enumerate(diarization.labels())
+        }
+        return turns, embeddings
+    
     def step4_align_transcript(
         self,
         segments: List[Dict],
@@ -254,40 +596,106 @@ class BodycamProcessor:
         
         json_path = output_dir / "labeled_transcript.json"
         with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(labeled_segments, f, indent=2)
+            json.dump(labeled_segments, f, separators=(',', ':'))
+        
+        store_path = write_store(labeled_segments, output_dir / "labeled_transcript.store")
         
         logger.info(f"✓ Labeled transcript (TXT): {txt_path}")
         logger.info(f"✓ Labeled transcript (JSON): {json_path}")
+        logger.info(f"✓ Labeled transcript (store): {store_path}")
         logger.info(f"✓ Processed {len(labeled_segments)} segments")
         
         return str(txt_path), str(json_path)
     
-    def process_bodycam_footage(self, mp4_path: str) -> Dict[str, str]:
+    def step5_redact_audio(
+        self,
+        mp4_path: str,
+        wav_path: str,
+        pii_config: str = None,
+        mode: str = "bleep",
+        words: List[Dict] = None
+    ) -> Dict[str, str]:
+        logger.info("=" * 60)
+        logger.info("STEP 5: Redacting PII from Audio")
+        logger.info("=" * 60)
+        
+        import audio_redact
+        
+        wav_path = Path(wav_path)
+        if words is None:
+            words = self.transcribe_words(wav_path)
+        words_path = wav_path.parent / "session_words.json"
+        
+        matcher = audio_redact.PIIMatcher.from_config(pii_config)
+        spans = matcher.find_spans(words)
+        logger.info(f"✓ Found {len(spans)} PII spans")
+        for span in spans:
+            logger.info(f"  [{span.start:.2f}-{span.end:.2f}] {span.kind}")
+        metrics.inc("pii_spans", len(spans))
+        
+        # the 16 kHz WAV is only for timestamps; redact the source track at its
+        # native rate/channels so the output keeps its original audio quality
+        mp4_path = Path(mp4_path)
+        native_wav = wav_path.with_name(wav_path.stem + "_native.tmp.wav")
+        redacted_wav = wav_path.with_name(wav_path.stem + "_redacted.wav")
+        try:
+            with metrics.span("pipeline_step", step="redact_audio"):
+                audio_redact.extract_audio(str(mp4_path), str(native_wav))
+                audio_redact.redact_wav(str(native_wav), str(redacted_wav), spans, mode=mode)
+        finally:
+            native_wav.unlink(missing_ok=True)
+        logger.info(f"✓ Redacted audio: {redacted_wav}")
+        
+        redacted_mp4 = mp4_path.with_name(mp4_path.stem + "_audio_redacted.mp4")
+        with metrics.span("pipeline_step", step="mux"):
+            audio_redact.mux_audio(str(mp4_path), str(redacted_wav), str(redacted_mp4))
+        logger.info(f"✓ Video with redacted audio: {redacted_mp4}")
+        
+        return {
+            'words': str(words_path),
+            'redacted_wav': str(redacted_wav),
+            'redacted_mp4': str(redacted_mp4)
+        }
+    
+    def process_bodycam_footage(
+        self,
+        mp4_path: str,
+        redact_audio: bool = False,
+        officer_id: str = None
+    ) -> Dict[str, str]:
         logger.info("\n" + "=" * 60)
         logger.info("BODY-WORN CAMERA AUDIO PROCESSING PIPELINE")
         logger.info("=" * 60 + "\n")
         
         output_files = {}
+        metrics.sample_memory()
         
         try:
             wav_path = self.step1_convert_mp4_to_wav(mp4_path)
             output_files['wav'] = wav_path
             
-            raw_transcript_path, segments = self.step2_transcribe_audio(wav_path)
+            # with redaction on, one word-level Whisper pass feeds both the
+            # transcript segments and the PII matcher
+            words = self.transcribe_words(wav_path) if redact_audio else None
+            raw_transcript_path, segments = self.step2_transcribe_audio(wav_path, words)
             output_files['raw_transcript'] = raw_transcript_path
             
-            diarization, speaker_mapping = self.step3_diarize_speakers(wav_path)
+            diarization, speaker_mapping = self.step3_diarize_speakers(wav_path, officer_id)
             
             output_dir = Path(wav_path).parent
-            txt_path, json_path = self.step4_align_transcript(
-                segments,
-                diarization,
-                speaker_mapping,
-                output_dir
-            )
+            with metrics.span("pipeline_step", step="align"):
+                txt_path, json_path = self.step4_align_transcript(
+                    segments,
+                    diarization,
+                    speaker_mapping,
+                    output_dir
+                )
             output_files['labeled_txt'] = txt_path
             output_files['labeled_json'] = json_path
             
+            if redact_audio:
+                output_files.update(self.step5_redact_audio(mp4_path, wav_path, words=words))
+            
             logger.info("\n" + "=" * 60)
             logger.info("PROCESSING COMPLETE!")
             logger.info("=" * 60)
@@ -299,13 +707,25 @@ class BodycamProcessor:
             
         except Exception as e:
             logger.error(f"Error during processing: {str(e)}", exc_info=True)
+            metrics.inc("pipeline_errors", error=type(e).__name__)
             raise
 
 
 def main():
     
+    warnings.filterwarnings('ignore')
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    
     MP4_FILE = "body_worn_camera_example_footage.mp4"
     HF_TOKEN = None
+    REDACT_AUDIO = False
+    # badge of the officer wearing the camera; enables voiceprint labelling
+    OFFICER_ID = os.getenv("OFFICER_ID")
+    # WAV of that officer alone speaking; enrolls their voiceprint before processing
+    OFFICER_REFERENCE_WAV = os.getenv("OFFICER_REFERENCE_WAV")
     
     if not HF_TOKEN:
         HF_TOKEN = os.getenv("HF_TOKEN")
@@ -313,7 +733,14 @@ def main():
     processor = BodycamProcessor(hf_token=HF_TOKEN)
     
     try:
-        output_files = processor.process_bodycam_footage(MP4_FILE)
+        if OFFICER_ID and OFFICER_REFERENCE_WAV:
+            processor.enroll_officer(OFFICER_ID, OFFICER_REFERENCE_WAV)
+        
+        output_files = processor.process_bodycam_footage(
+            MP4_FILE,
+            redact_audio=REDACT_AUDIO,
+            officer_id=OFFICER_ID
+        )
         
         print("\n" + "=" * 60)
         print("SUCCESS! All files generated:")
@@ -0,0 +1,221 @@
+"""
+Columnar on-disk transcript store.
+
+A labeled transcript is written as a directory of flat arrays:
+
+    meta.json          count, duration, speaker labels
+    start.npy          float64 segment start times
+    end.npy            float64 segment end times
+    end_max.npy        running max of end, for window lookups
+    speaker.npy        uint16 index into meta["speakers"]
+    text_offsets.npy   int64 byte offsets into text.bin (count + 1 entries)
+    text.bin           UTF-8 text of all segments, concatenated
+
+TranscriptStore memory-maps these, so answering "segments around t" costs two
+binary searches and touches only the pages that are returned, no matter how
+long the recording is.
+"""
+
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Hard cap on segments returned by one query
+MAX_PAGE = 500
+# how long readers wait for a writer's directory swap to finish
+SWAP_WAIT_S = 1.0
+# minimum wait for a missing store: a directory listing racing the renames can
+# miss the .old.* marker, so don't trust its absence immediately
+SWAP_GRACE_S = 0.05
+SWAP_ATTEMPTS = 5
+
+
+def write_store(segments: List[Dict], path: str) -> str:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # unique per writer: the server's rebuild and a pipeline publish may overlap
+    tmp_path = Path(tempfile.mkdtemp(dir=path.parent, prefix=path.name + ".tmp."))
+
+    segments = sorted(segments, key=lambda s: s['start'])
+    speakers: List[str] = []
+    speaker_ids: Dict[str, int] = {}
+    for seg in segments:
+        if seg.get('speaker', "UNKNOWN") not in speaker_ids:
+            speaker_ids[seg.get('speaker', "UNKNOWN")] = len(speakers)
+            speakers.append(seg.get('speaker', "UNKNOWN"))
+
+    start = np.array([s['start'] for s in segments], dtype=np.float64)
+    end = np.array([s['end'] for s in segments], dtype=np.float64)
+    encoded = [s['text'].encode('utf-8') for s in segments]
+    offsets = np.zeros(len(segments) + 1, dtype=np.int64)
+    np.cumsum([len(t) for t in encoded], out=offsets[1:])
+
+    np.save(tmp_path / "start.npy", start)
+    np.save(tmp_path / "end.npy", end)
+    np.save(tmp_path / "end_max.npy", np.maximum.accumulate(end) if len(end) else end)
+    np.save(tmp_path / "speaker.npy", np.array([speaker_ids[s.get('speaker', "UNKNOWN")] for s in segments], dtype=np.uint16))
+    np.save(tmp_path / "text_offsets.npy", offsets)
+    with open(tmp_path / "text.bin", "wb") as f:
+        f.write(b"".join(encoded))
+    with open(tmp_path / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({
+            'version': 1,
+            'count': len(segments),
+            'duration': float(end.max()) if len(end) else 0.0,
+            'speakers': speakers
+        }, f)
+
+    # swap directories; readers holding the old maps keep working on POSIX.
+    # The store is briefly missing in between; readers see the .old.* sibling
+    # and wait (wait_for_swap). If another writer swaps in first, retry: last wins.
+    for attempt in range(SWAP_ATTEMPTS):
+        old_path = tempfile.mkdtemp(dir=path.parent, prefix=path.name + ".old.")
+        os.rmdir(old_path)
+        try:
+            os.replace(path, old_path)
+        except FileNotFoundError:
+            pass
+        try:
+            os.replace(tmp_path, path)
+            break
+        except OSError:
+            if attempt == SWAP_ATTEMPTS - 1:
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                raise
+        finally:
+            shutil.rmtree(old_path, ignore_errors=True)
+    return str(path)
+
+
+class StoreChanged(FileNotFoundError):
+    """The store was swapped by a writer while it was being opened."""
+
+
+def swap_in_progress(path: str) -> bool:
+    path = Path(path)
+    return not (path / "meta.json").exists() and any(path.parent.glob(path.name + ".old.*"))
+
+
+def wait_for_swap(path: str, timeout: float = SWAP_WAIT_S) -> bool:
+    """Wait out a writer's directory swap; True if the store exists afterwards."""
+    start = time.monotonic()
+    while not (Path(path) / "meta.json").exists():
+        elapsed = time.monotonic() - start
+        if elapsed >= timeout or (elapsed >= SWAP_GRACE_S and not swap_in_progress(path)):
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def open_store(path: str, timeout: float = SWAP_WAIT_S) -> "TranscriptStore":
+    """TranscriptStore(path), retrying if a writer swaps the store while it opens."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return TranscriptStore(path)
+        except (FileNotFoundError, ValueError):
+            # ValueError: e.g. an mmap over a file replaced by another version
+            if time.monotonic() >= deadline or not wait_for_swap(path, deadline - time.monotonic()):
+                raise
+
+
+class TranscriptStore:
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        with open(self.path / "meta.json", "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.mtime_ns = os.stat(self.path / "meta.json").st_mtime_ns
+        self.start = np.load(self.path / "start.npy", mmap_mode='r')
+        self.end = np.load(self.path / "end.npy", mmap_mode='r')
+        self.end_max = np.load(self.path / "end_max.npy", mmap_mode='r')
+        self.speaker = np.load(self.path / "speaker.npy", mmap_mode='r')
+        self.text_offsets = np.load(self.path / "text_offsets.npy", mmap_mode='r')
+        self._text_file = open(self.path / "text.bin", "rb")
+        self._text = b""
+        try:
+            # mmap refuses empty files
+            if self.text_offsets[-1] > 0:
+                self._text = mmap.mmap(self._text_file.fileno(), 0, access=mmap.ACCESS_READ)
+            # files opened across a swap could mix two versions of the store
+            if self.is_stale() or len(self.start) != self.meta['count'] or len(self._text) != self.text_offsets[-1]:
+                raise StoreChanged(f"Transcript store {self.path} changed while opening")
+        except (ValueError, OSError):
+            self.close()
+            raise
+
+    def __len__(self) -> int:
+        return self.meta['count']
+
+    def close(self):
+        if isinstance(self._text, mmap.mmap):
+            self._text.close()
+        self._text_file.close()
+
+    def is_stale(self) -> bool:
+        try:
+            return os.stat(self.path / "meta.json").st_mtime_ns != self.mtime_ns
+        except FileNotFoundError:
+            return True
+
+    def window(self, start: float, end: float):
+        """Index range [i0, i1) of segments overlapping [start, end)."""
+        i0 = int(np.searchsorted(self.end_max, start, side='right'))
+        i1 = int(np.searchsorted(self.start, end, side='left'))
+        return i0, max(i0, i1)
+
+    def rows(self, i0: int, i1: int) -> Dict:
+        """Columnar payload for segments [i0, i1)."""
+        offsets = self.text_offsets[i0:i1 + 1]
+        texts = [
+            self._text[offsets[k]:offsets[k + 1]].decode('utf-8')
+            for k in range(i1 - i0)
+        ]
+        return {
+            'offset': i0,
+            'total': len(self),
+            'duration': self.meta['duration'],
+            'speakers': self.meta['speakers'],
+            'start': self.start[i0:i1].tolist(),
+            'end': self.end[i0:i1].tolist(),
+            'speaker': self.speaker[i0:i1].tolist(),
+            'text': texts
+        }
+
+    def query(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        offset: int = 0,
+        limit: int = MAX_PAGE
+    ) -> Dict:
+        """
+        Segments overlapping [start, end) if a time window is given, otherwise
+        a plain page of `limit` segments from `offset`.
+        """
+        limit = max(0, min(limit, MAX_PAGE))
+        if start is not None or end is not None:
+            i0, i1 = self.window(
+                start if start is not None else float('-inf'),
+                end if end is not None else float('inf')
+            )
+            i0 += max(0, offset)
+        else:
+            i0, i1 = max(0, offset), len(self)
+        i0 = min(i0, len(self))
+        return self.rows(i0, min(i1, i0 + limit))
+
+
+def convert_json(json_path: str, store_path: Optional[str] = None) -> str:
+    """One-off conversion of an existing labeled_transcript.json."""
+    json_path = Path(json_path)
+    with open(json_path, "r", encoding="utf-8") as f:
+        segments = json.load(f)
+    return write_store(segments, store_path or json_path.with_suffix(".store"))
@@ -0,0 +1,286 @@
+"""
+Object detector backends for the redaction renderer.
+
+Both backends take an HxWx3 uint8 frame and return an (N, 6) float32 array of
+[x1, y1, x2, y2, confidence, class_id] in frame pixel coordinates, plus a
+`names` list mapping class ids to labels.
+
+- "torch": yolov5 through torch.hub (eager PyTorch, AutoShape pre/post).
+- "onnx":  the same weights exported to ONNX and run on onnxruntime's CPU
+           execution provider, with letterbox/normalisation done in one
+           OpenCV blob call and NMS in NumPy.
+
+Select with load_detector(backend) or the PRESAI_DETECTOR env var.
+"""
+
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metrics
+
+DEFAULT_WEIGHTS = "yolov5x6"
+# class labels the renderers blur out
+REDACT_LABELS = ("laptop",)
+# AutoShape defaults, kept identical so both backends agree
+INFERENCE_SIZE = 640
+STRIDE = 64
+CONF_THRES = 0.25
+IOU_THRES = 0.45
+MAX_DET = 1000
+MAX_NMS = 30000
+MAX_WH = 7680
+
+
+def inference_shape(height, width, size=INFERENCE_SIZE, stride=STRIDE):
+    """Network input (h, w) AutoShape would pick for a frame of this size."""
+    gain = size / max(height, width)
+    return tuple(int(np.ceil(x * gain / stride) * stride) for x in (height, width))
+
+
+def letterbox(image, new_shape, color=(114, 114, 114)):
+    h, w = image.shape[:2]
+    r = min(new_shape[0] / h, new_shape[1] / w)
+    new_unpad = int(round(w * r)), int(round(h * r))
+    dw = (new_shape[1] - new_unpad[0]) / 2
+    dh = (new_shape[0] - new_unpad[1]) / 2
+    if (w, h) != new_unpad:
+        image = cv2.resize(image, new_unpad, interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    return cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+
+
+def nms(boxes, scores, iou_thres):
+    """Greedy NMS over xyxy boxes; returns kept indices in score order."""
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_thres]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def postprocess(pred, input_shape, frame_shape, conf_thres=CONF_THRES, iou_thres=IOU_THRES, max_det=MAX_DET):
+    """
+    Decode raw yolov5 output (N, 5 + classes) of [cx, cy, w, h, obj, cls...]
+    into frame-space detections, mirroring yolov5's non_max_suppression.
+    """
+    pred = pred[pred[:, 4] > conf_thres]
+    if not len(pred):
+        return np.zeros((0, 6), dtype=np.float32)
+
+    cls_scores = pred[:, 5:] * pred[:, 4:5]
+    cls_ids = cls_scores.argmax(1)
+    conf = cls_scores[np.arange(len(pred)), cls_ids]
+    mask = conf > conf_thres
+    pred, conf, cls_ids = pred[mask], conf[mask], cls_ids[mask]
+    if not len(pred):
+        return np.zeros((0, 6), dtype=np.float32)
+
+    if len(pred) > MAX_NMS:
+        top = conf.argsort()[::-1][:MAX_NMS]
+        pred, conf, cls_ids = pred[top], conf[top], cls_ids[top]
+
+    boxes = np.empty((len(pred), 4), dtype=np.float32)
+    half_w, half_h = pred[:, 2] / 2, pred[:, 3] / 2
+    boxes[:, 0] = pred[:, 0] - half_w
+    boxes[:, 1] = pred[:, 1] - half_h
+    boxes[:, 2] = pred[:, 0] + half_w
+    boxes[:, 3] = pred[:, 1] + half_h
+
+    # class-aware NMS in one pass by pushing each class into its own region
+    keep = nms(boxes + (cls_ids * MAX_WH)[:, None], conf, iou_thres)[:max_det]
+    boxes, conf, cls_ids = boxes[keep], conf[keep], cls_ids[keep]
+
+    # undo letterbox
+    h0, w0 = frame_shape[:2]
+    gain = min(input_shape[0] / h0, input_shape[1] / w0)
+    pad_x = (input_shape[1] - w0 * gain) / 2
+    pad_y = (input_shape[0] - h0 * gain) / 2
+    boxes[:, [0, 2]] = np.clip((boxes[:, [0, 2]] - pad_x) / gain, 0, w0)
+    boxes[:, [1, 3]] = np.clip((boxes[:, [1, 3]] - pad_y) / gain, 0, h0)
+
+    return np.concatenate(
+        [boxes, conf[:, None], cls_ids[:, None].astype(np.float32)], axis=1
+    ).astype(np.float32)
+
+
+class TorchHubDetector:
+
+    backend = "torch"
+
+    def __init__(self, weights=DEFAULT_WEIGHTS, force_reload=True):
+        import torch
+        with metrics.span("model_load", model=weights, backend=self.backend):
+            self.model = torch.hub.load("ultralytics/yolov5", weights, pretrained=True, force_reload=force_reload)
+        names = self.model.names
+        self.names = [names[i] for i in range(len(names))] if isinstance(names, dict) else list(names)
+
+    def detect(self, image):
+        results = self.model(image, size=INFERENCE_SIZE)
+        return results.xyxy[0].cpu().numpy().astype(np.float32)
+
+
+class OnnxDetector:
+
+    backend = "onnx"
+
+    def __init__(self, model_path=None, weights=DEFAULT_WEIGHTS, num_threads=None):
+        import onnxruntime as ort
+
+        model_path = model_path or f"{weights}.onnx"
+        if not os.path.exists(model_path):
+            print(f"{model_path} not found, exporting {weights} to ONNX...")
+            export_onnx(weights, model_path)
+
+        if num_threads is None:
+            try:
+                import psutil
+                num_threads = psutil.cpu_count(logical=False)
+            except ImportError:
+                num_threads = None
+            num_threads = num_threads or os.cpu_count() or 1
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = num_threads
+        options.inter_op_num_threads = 1
+
+        with metrics.span("model_load", model=os.path.basename(model_path), backend=self.backend):
+            self.session = ort.InferenceSession(
+                model_path, sess_options=options, providers=["CPUExecutionProvider"]
+            )
+            if "dynamic_grid" not in self.session.get_modelmeta().custom_metadata_map:
+                # exported before Detect was made dynamic: grids are fixed at 640x640
+                print(f"{model_path} has fixed detection grids, re-exporting {weights}...")
+                export_onnx(weights, model_path)
+                self.session = ort.InferenceSession(
+                    model_path, sess_options=options, providers=["CPUExecutionProvider"]
+                )
+        self.input_name = self.session.get_inputs()[0].name
+        self.names = json.loads(self.session.get_modelmeta().custom_metadata_map["names"])
+
+    def detect(self, image):
+        input_shape = inference_shape(*image.shape[:2])
+        # resize + pad, then HWC->NCHW float32 /255 in a single call; channels are
+        # left as given, matching AutoShape's handling of numpy input
+        blob = cv2.dnn.blobFromImage(
+            letterbox(image, input_shape), scalefactor=1 / 255.0, swapRB=False
+        )
+        pred = self.session.run(None, {self.input_name: blob})[0][0]
+        return postprocess(pred, input_shape, image.shape)
+
+
+def export_onnx(weights=DEFAULT_WEIGHTS, output_path=None, opset=17):
+    """Export hub weights to ONNX with dynamic H/W and the class names embedded."""
+    import torch
+    import onnx
+
+    output_path = output_path or f"{weights}.onnx"
+    model = torch.hub.load("ultralytics/yolov5", weights, pretrained=True, autoshape=False)
+    model.eval()
+    # as yolov5's export.py --dynamic: rebuild grids/anchors from the input
+    # shape at run time instead of baking in the 640x640 traced ones
+    for module in model.modules():
+        if type(module).__name__ == "Detect":
+            module.dynamic = True
+            module.export = True
+
+    class _Raw(torch.nn.Module):
+        # keep only pred; the wrapper may hand back (pred,) or pred itself
+        def __init__(self, m):
+            super().__init__()
+            self.m = m
+
+        def forward(self, x):
+            out = self.m(x)
+            return out[0] if isinstance(out, (list, tuple)) else out
+
+    dummy = torch.zeros(1, 3, INFERENCE_SIZE, INFERENCE_SIZE)
+    torch.onnx.export(
+        _Raw(model), dummy, output_path,
+        opset_version=opset,
+        input_names=["images"],
+        output_names=["output"],
+        dynamic_axes={"images": {2: "height", 3: "width"}, "output": {1: "anchors"}},
+    )
+
+    names = model.names
+    names = [names[i] for i in range(len(names))] if isinstance(names, dict) else list(names)
+    onnx_model = onnx.load(output_path)
+    for key, value in (("names", json.dumps(names)), ("dynamic_grid", "1")):
+        meta = onnx_model.metadata_props.add()
+        meta.key, meta.value = key, value
+    onnx.save(onnx_model, output_path)
+    print(f"Exported {weights} to {output_path}")
+    return output_path
+
+
+def load_detector(backend=None, **kwargs):
+    backend = (backend or os.getenv("PRESAI_DETECTOR", "torch")).lower()
+    if backend == "torch":
+        return TorchHubDetector(**kwargs)
+    if backend == "onnx":
+        return OnnxDetector(**kwargs)
+    raise ValueError(f"Unknown detector backend '{backend}' (expected 'torch' or 'onnx')")
+
+
+def check_parity(image, reference, candidate, atol=2.0):
+    """
+    Compare two backends on one frame. Detections are matched greedily by class
+    and IoU; returns the max corner error in pixels and the unmatched counts.
+    """
+    a, b = reference.detect(image), candidate.detect(image)
+    unmatched_b = list(range(len(b)))
+    max_err, unmatched_a = 0.0, 0
+    for det in a:
+        best, best_err = None, None
+        for j in unmatched_b:
+            if b[j, 5] != det[5]:
+                continue
+            err = float(np.abs(b[j, :4] - det[:4]).max())
+            if best_err is None or err < best_err:
+                best, best_err = j, err
+        if best is None or best_err > atol:
+            unmatched_a += 1
+            continue
+        unmatched_b.remove(best)
+        max_err = max(max_err, best_err)
+    return {"max_error_px": max_err, "missing": unmatched_a, "extra": len(unmatched_b)}
+
+
+def read_frame(path, index=0):
+    """A frame from an image or, for videos, frame `index`."""
+    frame = cv2.imread(path)
+    if frame is not None:
+        return frame
+    vidcap = cv2.VideoCapture(path)
+    vidcap.set(cv2.CAP_PROP_POS_FRAMES, index)
+    success, frame = vidcap.read()
+    vidcap.release()
+    if not success:
+        raise IOError(f"Could not read a frame from {path}")
+    return frame
+
+
+if __name__ == "__main__":
+    # python video/detectors.py <image|video>: export if needed and compare
+    # backends. Use a non-square frame (e.g. 1080p from the sample video): it
+    # runs at a 384x640 input, which is what dynamic export has to get right.
+    frame = read_frame(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 0)
+    print(f"Frame {frame.shape[1]}x{frame.shape[0]}, network input {inference_shape(*frame.shape[:2])}")
+    print(check_parity(frame, load_detector("torch"), load_detector("onnx")))
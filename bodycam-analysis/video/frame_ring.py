@@ -0,0 +1,247 @@
+"""
+Zero-copy frame hand-off between decode, detect/redact and encode.
+
+FrameRing is a fixed set of preallocated HxWx3 uint8 slots in one
+multiprocessing.shared_memory block. Stages pass slot indices (plain ints)
+over queues instead of pickled frames:
+
+    ffmpeg decode --readinto--> slot --index--> detect workers (redact in place)
+                                                    |
+    ffmpeg encode <--write(memoryview)-- slot <-index-+
+
+The only copies are the unavoidable pipe reads/writes to ffmpeg. Frames stay
+in their slot from decode to encode, and a slot is only reused once the
+encoder has written it, so memory is fixed at `n_slots` frames no matter how
+far decode gets ahead of inference.
+"""
+
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import get_context
+from multiprocessing import shared_memory
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metrics
+from detectors import REDACT_LABELS
+from render import FRAME_BATCH, redact_frame_inplace
+from shard_render import ENCODE_ARGS, _load_worker_detector, prepare_detector, probe
+
+# how often the encoder checks on workers while waiting for a frame
+WORKER_POLL_S = 0.5
+
+
+class FrameRing:
+    """
+    Preallocated frame slots in shared memory. Create once in the parent;
+    pickling sends only the block name, and the copy attaches to the same
+    memory in the child process.
+    """
+
+    def __init__(self, n_slots, shape, name=None):
+        self.n_slots = n_slots
+        self.shape = tuple(shape)
+        size = n_slots * int(np.prod(self.shape))
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        elif sys.version_info >= (3, 13):
+            # the parent owns the block; don't let the child's tracker unlink it
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.frames = np.ndarray((n_slots, *self.shape), dtype=np.uint8, buffer=self.shm.buf)
+
+    def __getstate__(self):
+        return {'n_slots': self.n_slots, 'shape': self.shape, 'name': self.shm.name}
+
+    def __setstate__(self, state):
+        self.__init__(state['n_slots'], state['shape'], name=state['name'])
+
+    def __len__(self):
+        return self.n_slots
+
+    def __getitem__(self, slot):
+        return self.frames[slot]
+
+    def buffer(self, slot):
+        """Raw bytes of one slot, for readinto/write without a copy."""
+        return memoryview(self.frames[slot]).cast('B')
+
+    def close(self):
+        # views must be gone before the mapping can be closed
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _read_exact(stream, view):
+    """Fill `view` from `stream`; returns False on EOF before it is full."""
+    filled = 0
+    while filled < len(view):
+        n = stream.readinto(view[filled:])
+        if not n:
+            return False
+        filled += n
+    return True
+
+
+def _detect_worker(ring, backend, labels, threads, work_q, done_q):
+    detector = _load_worker_detector(backend, threads)
+    try:
+        while True:
+            item = work_q.get()
+            if item is None:
+                break
+            slot, index = item
+            redact_frame_inplace(detector, ring[slot], labels)
+            done_q.put((slot, index))
+    finally:
+        # one sentinel per worker, even on failure, so the encoder can finish
+        done_q.put(None)
+        ring.close()
+
+
+def render_pipelined(vid, output, n_workers=None, n_slots=None, backend=None, labels=REDACT_LABELS):
+    """
+    Redact `vid` into `output` with decode, `n_workers` detect processes and
+    encode running concurrently over a shared FrameRing. Frames are encoded in
+    source order; the original audio is copied into the output.
+    """
+    backend = (backend or os.getenv("PRESAI_DETECTOR", "torch")).lower()
+    n_workers = n_workers or 1
+    # enough slots to keep every worker busy while the encoder drains a few
+    n_slots = n_slots or 2 * n_workers + 4
+    threads = max(1, (os.cpu_count() or 1) // n_workers)
+
+    width, height, rate, _, _, total = probe(vid)
+    frame_bytes = width * height * 3
+    print(f"Rendering {total} frames with {n_workers} worker(s) over {n_slots} shared slots "
+          f"({n_slots * frame_bytes / 1e6:.0f} MB)")
+    prepare_detector(backend)
+
+    ring = FrameRing(n_slots, (height, width, 3))
+    ctx = get_context("spawn")
+    # done_q needs get(timeout=...) so a hard-killed worker can't hang the encoder
+    work_q, done_q = ctx.SimpleQueue(), ctx.Queue()
+    free_slots = queue.Queue()
+    for slot in range(n_slots):
+        free_slots.put(slot)
+    stop = threading.Event()
+    decoded = [0]
+
+    decoder = subprocess.Popen(
+        ['ffmpeg', '-v', 'error', '-i', vid, '-an', '-f', 'rawvideo', '-pix_fmt', 'bgr24', 'pipe:1'],
+        stdout=subprocess.PIPE
+    )
+    encoder = subprocess.Popen(
+        ['ffmpeg', '-v', 'error',
+         '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f"{width}x{height}", '-r', rate, '-i', 'pipe:0',
+         '-i', vid, '-map', '0:v:0', '-map', '1:a:0?',
+         *ENCODE_ARGS, '-c:a', 'copy', '-y', output],
+        stdin=subprocess.PIPE
+    )
+    workers = [
+        ctx.Process(target=_detect_worker, args=(ring, backend, tuple(labels), threads, work_q, done_q))
+        for _ in range(n_workers)
+    ]
+    for w in workers:
+        w.start()
+
+    def decode_loop():
+        try:
+            while not stop.is_set():
+                try:
+                    slot = free_slots.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if not _read_exact(decoder.stdout, ring.buffer(slot)):
+                    break
+                work_q.put((slot, decoded[0]))
+                decoded[0] += 1
+        finally:
+            for _ in workers:
+                work_q.put(None)
+
+    decode_thread = threading.Thread(target=decode_loop, name="ring-decode")
+    decode_thread.start()
+
+    # encode on this thread: reorder by frame index, write straight from the slot
+    pending = {}
+    written, finished = 0, 0
+    start = batch_start = time.perf_counter()
+    try:
+        while finished < n_workers:
+            try:
+                item = done_q.get(timeout=WORKER_POLL_S)
+            except queue.Empty:
+                # an OOM-kill or segfault skips the worker's finally, so its
+                # sentinel never arrives; notice the dead process instead
+                dead = [w for w in workers if w.exitcode not in (None, 0)]
+                if dead:
+                    raise RuntimeError(
+                        f"Detect worker {dead[0].pid} died with exit code {dead[0].exitcode}; "
+                        f"encoded {written} of {decoded[0]} decoded frames"
+                    )
+                continue
+            if item is None:
+                finished += 1
+                if decode_thread.is_alive():
+                    # a worker quit before decoding ended; its frames are lost
+                    stop.set()
+                continue
+            slot, index = item
+            pending[index] = slot
+            while written in pending:
+                slot = pending.pop(written)
+                encoder.stdin.write(ring.buffer(slot))
+                free_slots.put(slot)
+                written += 1
+                if metrics.registry.enabled and written % FRAME_BATCH == 0:
+                    now = time.perf_counter()
+                    metrics.set_gauge("render_fps", FRAME_BATCH / (now - batch_start))
+                    metrics.set_gauge("frame_ring_slots_in_use", n_slots - free_slots.qsize())
+                    metrics.inc("render_frames", FRAME_BATCH)
+                    metrics.sample_memory()
+                    batch_start = now
+    finally:
+        stop.set()
+        decode_thread.join()
+        decoder.stdout.close()
+        decoder.wait()
+        encoder.stdin.close()
+        encoder.wait()
+        for w in workers:
+            # a worker killed mid-get can leave work_q's lock held, blocking the rest
+            w.join(timeout=5)
+            if w.is_alive():
+                w.terminate()
+                w.join()
+        ring.close()
+        metrics.inc("render_frames", written % FRAME_BATCH)
+        metrics.observe("render_total_seconds", time.perf_counter() - start)
+
+    if written != decoded[0] or any(w.exitcode for w in workers):
+        raise RuntimeError(f"Detect workers failed: encoded {written} of {decoded[0]} decoded frames")
+    if encoder.returncode != 0:
+        raise RuntimeError(f"Encoding {output} failed")
+    elapsed = time.perf_counter() - start
+    print(f"{written} frames in {elapsed:.1f}s ({written / max(elapsed, 1e-9):.1f} fps)")
+    return output
+
+
+def main():
+    vid = "./body_worn_camera_example_footage.mp4"
+    vid_name = "body_cam_model_test"
+    print(f"Output: {render_pipelined(vid, vid_name + '_audio.mp4', n_workers=2)}")
+
+
+if __name__ == "__main__":
+    main()
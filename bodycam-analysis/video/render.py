@@ -106,16 +106,25 @@
 #     except Exception as e:
 #         print(f"Audio Export Failed\n{e}")
 
+import os
+import sys
+import subprocess
+from pathlib import Path
 import cv2
-import torch
-import moviepy.editor as mp
 # from ultralytics import YOLO
 import time
-import matplotlib.pyplot as plt
-import cv2
-from scipy.ndimage import gaussian_filter
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metrics
+from checkpoint import JobCheckpoint, fingerprint
+from detectors import REDACT_LABELS, load_detector
+
+# frames per timing span / fps sample
+FRAME_BATCH = 30
+# frames per encoded output segment; every finished segment is a resume point
+SEGMENT_FRAMES = 300
+
 """test for yolov8 through YOLO lib"""
 # model = YOLO("yolov8n.pt")
 # results = model(images)
@@ -128,101 +137,181 @@ import numpy as np
 # results[0].save(filename="test_yolo26_m.jpg")
 
 
-model = torch.hub.load("ultralytics/yolov5", "yolov5x6", pretrained=True, force_reload=True)
-# print(torch.hub.list("ultralytics/yolov5"))
-
-# MODEL TESTING ON IMAGES
-images = ['http://images.cocodataset.org/val2017/000000039769.jpg', 'https://ultralytics.com/images/zidane.jpg']
-results = model(images)
-results.print()
-# print(detect)
-# if "cat" in detect:
-img = results.ims[0]
-img = img.copy()
-if True:
-  boxes_df = results.pandas().xyxy[0]
-  if True:
+def load_model(backend=None):
+    # backend: "torch" (default) or "onnx"; see detectors.py
+    return load_detector(backend)
+
+
+def preview_sample_images(model):
+    import matplotlib.pyplot as plt
+    from scipy.ndimage import gaussian_filter
+
+    # MODEL TESTING ON IMAGES
+    images = ['http://images.cocodataset.org/val2017/000000039769.jpg', 'https://ultralytics.com/images/zidane.jpg']
+    results = model(images)
+    results.print()
+    img = results.ims[0]
+    img = img.copy()
+    boxes_df = results.pandas().xyxy[0]
     first_obj_params = boxes_df.loc[boxes_df["name"] == "cat"]
-    # first_obj_params = [int(boxes_df[column][0]) for column in list(boxes_df.columns[:4])]
     print(first_obj_params)
     for index, row in first_obj_params.iterrows():
-      first_obj_params = np.array(first_obj_params)
       df_obj_del = [int(row[column]) for column in list(boxes_df.columns[:4])]
-      # print(first_obj_params[0])
       img[df_obj_del[1]:df_obj_del[3], df_obj_del[0]:df_obj_del[2]] = gaussian_filter(img[df_obj_del[1]:df_obj_del[3], df_obj_del[0]:df_obj_del[2]], sigma=7)
-      # print(first_obj_params)
     print(boxes_df.head())
 
-# results.render()
-img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
-# cv2.imwrite("test_blur_img.jpg", img)
-plt.imshow(img)
-plt.show()
-
-# video stuff
-vid = "./body_worn_camera_example_footage.mp4"
-# vid = "./test_vid.mp4"
-vidcap = cv2.VideoCapture(vid)
-audio = mp.VideoFileClip(vid)
-audio = audio.audio
+    # results.render()
+    img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+    # cv2.imwrite("test_blur_img.jpg", img)
+    plt.imshow(img)
+    plt.show()
+
+
+def draw_detections(frame, detections, names):
+    for x1, y1, x2, y2, conf, cls in detections:
+      p1, p2 = (int(x1), int(y1)), (int(x2), int(y2))
+      cv2.rectangle(frame, p1, p2, (0, 255, 0), 2)
+      cv2.putText(frame, f"{names[int(cls)]} {conf:.2f}", (p1[0], max(p1[1] - 4, 10)),
+                  cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1, cv2.LINE_AA)
+
+
+def redact_frame(model, image, labels=REDACT_LABELS):
+    return redact_frame_inplace(model, image.copy(), labels)
+
+
+def redact_frame_inplace(model, frame, labels=REDACT_LABELS):
+    # same output as redact_frame, but blurs, draws and swaps channels in
+    # `frame` itself (e.g. a shared-memory slot) without allocating a new frame
+    detections = model.detect(frame)
+    draw_detections(frame, detections, model.names)
+    # obj_params = detections[names == "person"]
+    wanted = [i for i, name in enumerate(model.names) if name in labels]
+    for x1, y1, x2, y2, _, _ in detections[np.isin(detections[:, 5], wanted)]:
+      x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+      roi = frame[y1:y2, x1:x2]
+      frame[y1:y2, x1:x2] = cv2.GaussianBlur(roi, (99, 99), 30)
+    cv2.cvtColor(frame, cv2.COLOR_RGB2BGR, dst=frame)
+    return frame
+
+
+def skip_frames(vidcap, count):
+    # CAP_PROP_POS_FRAMES seeks to the nearest keyframe on some containers;
+    # grabbing without decoding to BGR is exact and still cheap next to inference.
+    for _ in range(count):
+        if not vidcap.grab():
+            return False
+    return True
+
+
+def render_video(model, vid, vid_name, labels=REDACT_LABELS, segment_frames=SEGMENT_FRAMES):
+    """
+    Redact `vid` into `<vid_name>.mp4`. Frames are encoded into fixed-size
+    segments under `<vid_name>_segments/` and a checkpoint is written after
+    each one, so a crashed run picks up at the last finished segment and the
+    concatenated result is identical to an uninterrupted run.
+    """
+    vidcap = cv2.VideoCapture(vid)
+    if not vidcap.isOpened():
+        raise IOError(f"Error, could not open file {vid}")
 
-width, height, fps = 0, 0, 0
-
-if not vidcap.isOpened():
-    print("Error, could not open file")
-else:
     width = int(vidcap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(vidcap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     fps = int(vidcap.get(cv2.CAP_PROP_FPS))
-
-print(f"Width: {width} Height: {height}\n")
-
-# width, height = 640, 360
-
-success = True
-vid_name = "body_cam_model_test"
-fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-full_vid = cv2.VideoWriter(vid_name+".mp4", fourcc, fps, (width, height))
-
-try:
-    while success:
-        success, image = vidcap.read()
-        try:
-            if success:
-                results = model(image)
-                results.print()
-                results.render()
-                # full_vid.write(cv2.imread(path))
-                frame = results.ims[0].copy()
-                bound_box_df = results.pandas().xyxy[0]
-                # obj_params = bound_box_df.loc[bound_box_df["name"] == "person"]
-                obj_params = bound_box_df[bound_box_df["name"] == "laptop"]
-                for _, row in obj_params.iterrows():
-                  # new_obj_params = [int(row(column)) for column in list(bound_box_df.columns[:4])]
-                  x1, y1, x2, y2 = int(row['xmin']), int(row['ymin']), int(row['xmax']), int(row['ymax'])
-                  # frame[new_obj_params[1]:new_obj_params[3], new_obj_params[0]:new_obj_params[2]] = gaussian_filter(frame[new_obj_params[1]:new_obj_params[3], new_obj_params[0]:new_obj_params[2]], 7)
-                  roi = frame[y1:y2, x1:x2]
-                  blurred = cv2.GaussianBlur(roi, (99, 99), 30)
-                  frame[y1:y2, x1:x2] = blurred
-                frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-                full_vid.write(frame)
-        except Exception as e:
-            print(f"ERROR:\n{e}")
-            break
-
-finally:
-    vidcap.release()
-    full_vid.release()
-    cv2.destroyAllWindows()
-    # time.sleep(10)
+    print(f"Width: {width} Height: {height}\n")
+
+    segment_dir = Path(vid_name + "_segments")
+    segment_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint = JobCheckpoint(
+        segment_dir / "render.ckpt.json",
+        fingerprint(vid, model="yolov5x6", backend=model.backend, labels=list(labels), segment_frames=segment_frames)
+    )
+    state = checkpoint.load() or {"next_frame": 0, "segments": [], "done": False}
+
+    if state["next_frame"]:
+        print(f"Resuming at frame {state['next_frame']} ({len(state['segments'])} segments done)")
+        if not skip_frames(vidcap, state["next_frame"]):
+            state["done"] = True
+
+    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+    frame_count = 0
+    render_start = time.perf_counter()
+    batch_start = render_start
+    written = 0
 
     try:
+        while not state["done"]:
+            seg_path = segment_dir / f"segment_{len(state['segments']):05d}.mp4"
+            part_path = seg_path.with_suffix(".part.mp4")
+            writer = cv2.VideoWriter(str(part_path), fourcc, fps, (width, height))
+            written = 0
+            try:
+                while written < segment_frames:
+                    success, image = vidcap.read()
+                    if not success:
+                        state["done"] = True
+                        break
+                    writer.write(redact_frame(model, image, labels))
+                    written += 1
+                    frame_count += 1
+                    if metrics.registry.enabled and frame_count % FRAME_BATCH == 0:
+                        now = time.perf_counter()
+                        metrics.observe("render_batch_seconds", now - batch_start)
+                        metrics.set_gauge("render_fps", FRAME_BATCH / (now - batch_start))
+                        metrics.inc("render_frames", FRAME_BATCH)
+                        metrics.sample_memory()
+                        batch_start = now
+            finally:
+                writer.release()
+
+            if written:
+                os.replace(part_path, seg_path)
+                state["segments"].append(seg_path.name)
+                state["next_frame"] += written
+            else:
+                part_path.unlink(missing_ok=True)
+            checkpoint.save(state)
+    except Exception as e:
+        print(f"ERROR at frame {state['next_frame'] + written}:\n{e}")
+        metrics.inc("render_errors", error=type(e).__name__)
+        raise
+    finally:
+        vidcap.release()
+        cv2.destroyAllWindows()
+        metrics.inc("render_frames", frame_count % FRAME_BATCH)
+        metrics.observe("render_total_seconds", time.perf_counter() - render_start)
+
+    output = vid_name + ".mp4"
+    concat_segments(segment_dir, state["segments"], output)
+    return output
+
+
+def concat_segments(segment_dir, segments, output):
+    list_path = Path(segment_dir) / "segments.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for name in segments:
+            f.write(f"file '{name}'\n")
+    cmd = [
+        'ffmpeg', '-v', 'error',
+        '-f', 'concat', '-safe', '0',
+        '-i', str(list_path),
+        '-c', 'copy',
+        '-y', output
+    ]
+    with metrics.span("pipeline_step", step="concat"):
+        subprocess.run(cmd, check=True)
+
+
+def mux_audio(vid, vid_name):
+    try:
+        import moviepy.editor as mp
+        audio = mp.VideoFileClip(vid).audio
         vid_file_name = vid_name+".mp4"
         video = mp.VideoFileClip(vid_file_name)
 
         file_export = vid_name + "_audio.mp4"
         video = video.set_audio(audio)
-        video.write_videofile(file_export, codec="libx264", audio_codec="aac")
+        with metrics.span("pipeline_step", step="mux"):
+            video.write_videofile(file_export, codec="libx264", audio_codec="aac")
         video.close()
         audio.close()
 
@@ -230,4 +319,22 @@ finally:
         # files.download(vid_name+".mp4")
 
     except Exception as e:
-        print(f"\nAudio Export Failed\n{e}")
\ No newline at end of file
+        print(f"\nAudio Export Failed\n{e}")
+
+
+def main():
+    model = load_model()
+    if model.backend == "torch":
+        preview_sample_images(model.model)
+
+    # video stuff
+    vid = "./body_worn_camera_example_footage.mp4"
+    # vid = "./test_vid.mp4"
+    vid_name = "body_cam_model_test"
+
+    render_video(model, vid, vid_name)
+    mux_audio(vid, vid_name)
+
+
+if __name__ == "__main__":
+    main()
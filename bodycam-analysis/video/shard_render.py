@@ -0,0 +1,234 @@
+"""
+Time-sharded parallel redaction render.
+
+The input is split at keyframes into N contiguous frame ranges. Each range is
+decoded (ffmpeg input seek, exact because it lands on a keyframe), redacted
+and encoded to H.264 in its own process. The encoded shards are then joined
+with the concat demuxer and the original audio stream copied in, so nothing
+is re-encoded after the workers finish.
+
+Redaction is per-frame (no tracker state carries across frames), so shards
+need no overlap and the result matches a sequential render of the same frames.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metrics
+from checkpoint import JobCheckpoint, fingerprint
+from detectors import DEFAULT_WEIGHTS, REDACT_LABELS
+
+# shards shorter than this are not worth a process
+MIN_SHARD_FRAMES = 300
+ENCODE_ARGS = ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '18', '-pix_fmt', 'yuv420p']
+
+
+def probe(path):
+    out = subprocess.run(
+        ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+         '-show_entries', 'stream=width,height,r_frame_rate,nb_frames,duration,start_time',
+         '-of', 'json', path],
+        capture_output=True, check=True, text=True
+    ).stdout
+    stream = json.loads(out)['streams'][0]
+    num, den = stream['r_frame_rate'].split('/')
+    fps = float(num) / float(den)
+    start_time = float(stream.get('start_time') or 0.0)
+    nb_frames = stream.get('nb_frames')
+    total = int(nb_frames) if nb_frames not in (None, 'N/A') else int(round(float(stream['duration']) * fps))
+    return int(stream['width']), int(stream['height']), stream['r_frame_rate'], fps, start_time, total
+
+
+def keyframe_indices(path, fps, start_time):
+    """Frame index of every keyframe, from packet flags (no decoding needed)."""
+    out = subprocess.run(
+        ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+         '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', path],
+        capture_output=True, check=True, text=True
+    ).stdout
+    indices = set()
+    for line in out.splitlines():
+        pts, _, flags = line.partition(',')
+        if 'K' in flags and pts not in ('', 'N/A'):
+            indices.add(int(round((float(pts) - start_time) * fps)))
+    return sorted(indices)
+
+
+def plan_shards(keyframes, total_frames, n_shards):
+    """Split [0, total_frames) into up to `n_shards` ranges starting on keyframes."""
+    keyframes = np.asarray([k for k in keyframes if 0 < k < total_frames], dtype=np.int64)
+    n_shards = max(1, min(n_shards, total_frames // MIN_SHARD_FRAMES or 1))
+    cuts = []
+    if len(keyframes):
+        targets = np.arange(1, n_shards) * total_frames / n_shards
+        nearest = keyframes[np.abs(keyframes[None, :] - targets[:, None]).argmin(axis=1)]
+        # snapping to keyframes can bunch cuts up; drop any that would leave a short shard
+        for cut in sorted(set(nearest.tolist())):
+            if cut - (cuts[-1] if cuts else 0) >= MIN_SHARD_FRAMES and total_frames - cut >= MIN_SHARD_FRAMES:
+                cuts.append(cut)
+    bounds = [0] + cuts + [total_frames]
+    return [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def prepare_detector(backend):
+    """Fetch/export model files once, before workers race to do the same."""
+    if backend == "onnx":
+        from detectors import export_onnx
+        if not os.path.exists(f"{DEFAULT_WEIGHTS}.onnx"):
+            export_onnx(DEFAULT_WEIGHTS)
+    else:
+        import torch
+        torch.hub.load("ultralytics/yolov5", DEFAULT_WEIGHTS, pretrained=True, force_reload=True)
+
+
+def _load_worker_detector(backend, threads):
+    import cv2
+    from detectors import load_detector
+
+    cv2.setNumThreads(1)
+    if backend == "onnx":
+        return load_detector("onnx", num_threads=threads)
+    import torch
+    torch.set_num_threads(threads)
+    return load_detector("torch", force_reload=False)
+
+
+def render_shard(vid, shard_path, start_frame, end_frame, rate, fps, width, height,
+                 backend, labels, threads, last):
+    from render import redact_frame
+
+    done_marker = Path(str(shard_path) + ".done")
+    if done_marker.exists():
+        return str(shard_path)
+
+    detector = _load_worker_detector(backend, threads)
+    frame_bytes = width * height * 3
+    n_frames = end_frame - start_frame
+
+    decode = ['ffmpeg', '-v', 'error']
+    if start_frame:
+        # input seek jumps to the keyframe and drops frames before -ss; aim half a
+        # frame early so rounding can never skip or repeat the first frame
+        decode += ['-ss', f"{(start_frame - 0.5) / fps:.6f}"]
+    decode += ['-i', vid, '-an']
+    if not last:
+        decode += ['-frames:v', str(n_frames)]
+    decode += ['-f', 'rawvideo', '-pix_fmt', 'bgr24', 'pipe:1']
+    encode = [
+        'ffmpeg', '-v', 'error',
+        '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f"{width}x{height}", '-r', rate,
+        '-i', 'pipe:0', *ENCODE_ARGS, '-y', str(shard_path)
+    ]
+
+    decoder = subprocess.Popen(decode, stdout=subprocess.PIPE)
+    encoder = subprocess.Popen(encode, stdin=subprocess.PIPE)
+    written = 0
+    start = time.perf_counter()
+    try:
+        while True:
+            raw = decoder.stdout.read(frame_bytes)
+            if len(raw) < frame_bytes:
+                break
+            image = np.frombuffer(raw, dtype=np.uint8).reshape(height, width, 3)
+            encoder.stdin.write(redact_frame(detector, image, labels).tobytes())
+            written += 1
+    finally:
+        decoder.stdout.close()
+        decoder.wait()
+        encoder.stdin.close()
+        encoder.wait()
+
+    if encoder.returncode != 0:
+        raise RuntimeError(f"Encoding shard {shard_path} failed")
+    elapsed = time.perf_counter() - start
+    metrics.observe("shard_render_seconds", elapsed, backend=backend)
+    metrics.inc("render_frames", written)
+    print(f"Shard {Path(shard_path).name}: {written} frames in {elapsed:.1f}s ({written / max(elapsed, 1e-9):.1f} fps)")
+    done_marker.touch()
+    return str(shard_path)
+
+
+def render_sharded(vid, vid_name, n_shards=None, backend=None, labels=REDACT_LABELS):
+    """
+    Redact `vid` into `<vid_name>_audio.mp4` using `n_shards` processes
+    (default: one per physical core). Finished shards are kept with a `.done`
+    marker, so rerunning after a crash only redoes unfinished shards.
+    """
+    backend = (backend or os.getenv("PRESAI_DETECTOR", "torch")).lower()
+    if n_shards is None:
+        try:
+            import psutil
+            n_shards = psutil.cpu_count(logical=False)
+        except ImportError:
+            n_shards = None
+        n_shards = n_shards or os.cpu_count() or 1
+
+    width, height, rate, fps, start_time, total = probe(vid)
+    with metrics.span("pipeline_step", step="keyframe_scan"):
+        keyframes = keyframe_indices(vid, fps, start_time)
+    shards = plan_shards(keyframes, total, n_shards)
+    # split the cores between workers instead of oversubscribing
+    threads = max(1, (os.cpu_count() or 1) // len(shards))
+    print(f"Rendering {total} frames in {len(shards)} shard(s), {threads} thread(s) each")
+
+    shard_dir = Path(vid_name + "_shards")
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    plan = JobCheckpoint(
+        shard_dir / "plan.json",
+        fingerprint(vid, backend=backend, labels=list(labels), shards=shards, encode=ENCODE_ARGS)
+    )
+    if plan.load() is None:
+        # new input or a different split: finished shards from before are invalid
+        for marker in shard_dir.glob("*.done"):
+            marker.unlink()
+        plan.save({'shards': shards})
+    prepare_detector(backend)
+
+    jobs = []
+    with ProcessPoolExecutor(max_workers=len(shards), mp_context=get_context("spawn")) as pool:
+        for i, (a, b) in enumerate(shards):
+            shard_path = shard_dir / f"shard_{i:03d}.mp4"
+            jobs.append(pool.submit(
+                render_shard, vid, str(shard_path), a, b, rate, fps, width, height,
+                backend, tuple(labels), threads, i == len(shards) - 1
+            ))
+        with metrics.span("pipeline_step", step="render_sharded", shards=len(shards)):
+            shard_paths = [job.result() for job in jobs]
+
+    list_path = shard_dir / "shards.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in shard_paths:
+            f.write(f"file '{Path(path).name}'\n")
+
+    output = vid_name + "_audio.mp4"
+    cmd = [
+        'ffmpeg', '-v', 'error',
+        '-f', 'concat', '-safe', '0', '-i', str(list_path),
+        '-i', vid,
+        '-map', '0:v:0', '-map', '1:a:0?',
+        '-c', 'copy',
+        '-y', output
+    ]
+    with metrics.span("pipeline_step", step="concat"):
+        subprocess.run(cmd, check=True)
+    return output
+
+
+def main():
+    vid = "./body_worn_camera_example_footage.mp4"
+    vid_name = "body_cam_model_test"
+    print(f"Output: {render_sharded(vid, vid_name)}")
+
+
+if __name__ == "__main__":
+    main()
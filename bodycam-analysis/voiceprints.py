@@ -0,0 +1,145 @@
+"""
+Local store of officer voiceprints keyed by badge number.
+
+A voiceprint is the L2-normalised running mean of the speaker embeddings
+(pyannote/wespeaker, the same model speaker-diarization-3.1 uses) of an
+officer's reference recordings, weighted by seconds of speech. Only explicit
+enrollment writes to the store; processed footage is matched against it.
+Matching is one matrix product of unit vectors, i.e. cosine similarity
+against every enrolled officer at once.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_STORE_PATH = "voiceprints.npz"
+# cosine similarity needed to call a diarization cluster centroid a known voice
+CENTROID_MATCH_THRESHOLD = 0.5
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.maximum(norms, 1e-9)
+
+
+class VoiceprintStore:
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = Path(path)
+        self.ids: List[str] = []
+        self.embeddings = np.zeros((0, 0), dtype=np.float32)
+        self.weights = np.zeros(0, dtype=np.float64)
+        if self.path.exists():
+            with np.load(self.path, allow_pickle=False) as data:
+                self.ids = [str(i) for i in data["ids"]]
+                self.embeddings = data["embeddings"].astype(np.float32)
+                self.weights = data["weights"].astype(np.float64)
+
+    def __contains__(self, badge: str) -> bool:
+        return str(badge) in self.ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def get(self, badge: str) -> Optional[np.ndarray]:
+        badge = str(badge)
+        return self.embeddings[self.ids.index(badge)] if badge in self.ids else None
+
+    def enroll(self, badge: str, embedding: np.ndarray, weight: float = 1.0):
+        """Fold a new embedding into `badge`'s voiceprint (creating it if needed)."""
+        badge = str(badge)
+        embedding = _normalize(embedding)
+        if badge not in self.ids:
+            if len(self.ids) and embedding.shape[-1] != self.embeddings.shape[1]:
+                raise ValueError(
+                    f"Embedding size {embedding.shape[-1]} does not match store ({self.embeddings.shape[1]})"
+                )
+            self.ids.append(badge)
+            self.embeddings = (
+                embedding[None, :] if not len(self.embeddings)
+                else np.vstack([self.embeddings, embedding])
+            )
+            self.weights = np.append(self.weights, weight)
+            return
+
+        i = self.ids.index(badge)
+        total = self.weights[i] + weight
+        mean = (self.embeddings[i] * self.weights[i] + embedding * weight) / max(total, 1e-9)
+        self.embeddings[i] = _normalize(mean)
+        self.weights[i] = total
+
+    def similarity(self, embeddings: np.ndarray) -> np.ndarray:
+        """(M, N) cosine similarity of M embeddings against all N voiceprints."""
+        embeddings = _normalize(np.atleast_2d(embeddings))
+        if not len(self.ids):
+            return np.zeros((len(embeddings), 0), dtype=np.float32)
+        return embeddings @ self.embeddings.T
+
+    def match(
+        self,
+        embeddings: np.ndarray,
+        threshold: float = CENTROID_MATCH_THRESHOLD
+    ) -> List[Tuple[Optional[str], float]]:
+        """
+        Best voiceprint for each embedding. Each voiceprint is used at most once
+        (highest similarity wins), since one officer is one diarization cluster.
+        """
+        sims = self.similarity(embeddings)
+        result: List[Tuple[Optional[str], float]] = [(None, 0.0)] * len(sims)
+        if not sims.size:
+            return result
+        sims = np.where(np.isfinite(sims), sims, -1.0)
+        taken = set()
+        for flat in np.argsort(sims, axis=None)[::-1]:
+            row, col = np.unravel_index(flat, sims.shape)
+            if sims[row, col] < threshold:
+                break
+            if result[row][0] is not None or col in taken:
+                continue
+            result[row] = (self.ids[col], float(sims[row, col]))
+            taken.add(col)
+        return result
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.stem + ".tmp.npz")
+        np.savez(
+            tmp_path,
+            ids=np.array(self.ids, dtype=np.str_),
+            embeddings=self.embeddings,
+            weights=self.weights
+        )
+        os.replace(tmp_path, self.path)
+
+    def labels_for(self, badge: str) -> Dict[str, str]:
+        """Transcript label for each enrolled voice when `badge` wears the camera."""
+        return {
+            i: "OFFICER" if i == str(badge) else f"OFFICER_{i}"
+            for i in self.ids
+        }
+
+
+def greedy_cluster(embeddings: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Single-pass online clustering: each embedding joins the most similar
+    existing centroid above `threshold`, or starts a new cluster.
+    """
+    embeddings = _normalize(np.atleast_2d(embeddings))
+    assignments = np.full(len(embeddings), -1, dtype=np.int64)
+    sums: List[np.ndarray] = []
+    for i, emb in enumerate(embeddings):
+        if sums:
+            centroids = _normalize(np.stack(sums))
+            sims = centroids @ emb
+            best = int(sims.argmax())
+            if sims[best] >= threshold:
+                sums[best] = sums[best] + emb
+                assignments[i] = best
+                continue
+        sums.append(emb.copy())
+        assignments[i] = len(sums) - 1
+    return assignments